@@ -21,6 +21,8 @@ from django.urls import path, include
 from web import views
 
 urlpatterns = i18n_patterns(
+    path('admin/instrumentation/', views.instrumentation_stats,
+         name='instrumentation-stats'),
     path('admin/', admin.site.urls),
     path('', include('web.urls', namespace='web')),
     prefix_default_language=False
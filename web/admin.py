@@ -1,11 +1,14 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.postgres.fields.jsonb import KeyTextTransform
+from django.db.models import Exists, OuterRef, Q, Subquery, TextField
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
-from templated_mail.mail import BaseEmailMessage
 
-from .models import User, Group, Page, Tag, Report
-from .persian_editors import PersianEditors
+from .helpers import get_active_lang
+from .models import User, Group, Page, Tag, Report, Email
+from .persian_editors import get_editors
 
 admin.site.site_header = _('Laum Project administration')
 admin.site.site_title = _('Laum Project administration')
@@ -49,7 +52,29 @@ class BaseModelAdmin(admin.ModelAdmin):
                                           form_url, obj)
 
     def get_queryset(self, request):
-        return self.model.objects.active_language()
+        return self.model.localized.all()
+
+
+class TrigramSearchMixin:
+    """
+    Search `search_fields` with `ILIKE`, which their trigram indexes serve,
+    unlike `icontains`. Fields prefixed with `=` are matched whole.
+    """
+
+    def get_search_condition(self, request, term):
+        condition = Q()
+        for field_name in self.get_search_fields(request):
+            if field_name.startswith('='):
+                condition |= Q(**{field_name[1:]: term})
+            else:
+                condition |= Q(**{f'{field_name}__trigram_contains': term})
+        return condition
+
+    def get_search_results(self, request, queryset, search_term):
+        for term in search_term.split():
+            queryset = queryset.filter(
+                self.get_search_condition(request, term))
+        return queryset, False
 
 
 @admin.register(User)
@@ -90,7 +115,7 @@ class PageInlineAdmin(admin.TabularInline):
 
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(TrigramSearchMixin, admin.ModelAdmin):
     date_hierarchy = 'created_on'
     readonly_fields = ['gid', 'updated_on', 'created_on']
     fieldsets = [
@@ -99,19 +124,41 @@ class GroupAdmin(admin.ModelAdmin):
     ]
     list_display = ['title', 'updated_on', 'created_on', 'in_use']
     list_filter = ['updated_on', 'created_on']
-    search_fields = ['gid', 'pages__pid', 'pages__title']
+    # Annotated by `get_queryset()`, each served by an expression index.
+    title_fields = [f'title_{code}' for code, name in settings.LANGUAGES]
+    search_fields = ['=gid', *title_fields]
     inlines = [PageInlineAdmin]
 
+    def get_queryset(self, request):
+        # The stored titles, not the pages, so no join is needed.
+        return super().get_queryset(request).annotate(
+            page_title=KeyTextTransform(get_active_lang(), 'titles',
+                                        output_field=TextField()),
+            **{field_name: KeyTextTransform(code, 'titles',
+                                            output_field=TextField())
+               for field_name, (code, name) in zip(
+                   self.title_fields, settings.LANGUAGES)})
+
+    def get_search_condition(self, request, term):
+        # A subquery rather than a `pages__pid` join, which would repeat
+        # each group once per page.
+        pages = Page.objects.filter(pid=term).values('group_id')[:1]
+        return super().get_search_condition(request, term) | \
+            Q(gid=Subquery(pages))
+
     def in_use(self, obj):
-        return bool(obj.pages.all().count())
+        return bool(obj.titles)
 
     in_use.boolean = True
     in_use.short_description = _('In use?')
+    # An empty object sorts before the others.
+    in_use.admin_order_field = 'titles'
 
     def title(self, obj):
         return obj.__str__()
 
     title.short_description = _('Title')
+    title.admin_order_field = 'page_title'
 
 
 @admin.register(Page)
@@ -139,10 +186,11 @@ class PageAdmin(BaseModelAdmin):
     object_tools = ['link_to_reports', 'link_to_group']
 
     def has_group(self, obj):
-        return bool(obj.group)
+        return obj.group_id is not None
 
     has_group.boolean = True
     has_group.short_description = _('Has group?')
+    has_group.admin_order_field = 'group'
 
     def has_image(self, obj):
         return bool(obj.image)
@@ -156,15 +204,15 @@ class PageAdmin(BaseModelAdmin):
     link_to_reports.short_description = _('View reports')
 
     def link_to_group(self, obj):
-        if obj.group:
-            return reverse('admin:web_group_change', args=[obj.group.pk])
+        if obj.group_id:
+            return reverse('admin:web_group_change', args=[obj.group_id])
         return None
 
     link_to_group.short_description = _('Go to group')
 
     def save_model(self, request, obj, form, change):
-        editor = PersianEditors(['space', 'number',
-                                 'arabic', 'punctuation_marks'])
+        editor = get_editors(['space', 'number', 'arabic',
+                              'punctuation_marks'])
 
         obj.title = editor.run(obj.title)
         obj.subtitle = editor.run(obj.subtitle)
@@ -184,6 +232,7 @@ class ReportAdmin(BaseModelAdmin):
         [_('Important dates'), {'fields': ['updated_on', 'created_on']}]
     ]
     list_display = ['page', 'reporter', 'status', 'created_on']
+    list_select_related = ['page']
     list_filter = ['status', 'updated_on', 'created_on']
     search_fields = ['page__pid', 'page__title', 'rid', 'body', 'reporter',
                      'rid', 'description']
@@ -216,12 +265,11 @@ class ReportAdmin(BaseModelAdmin):
         if is_first_change and not form.cleaned_data['description']:
             obj.description = _('-')
 
-        editor = PersianEditors(
-            ['space', 'number', 'arabic', 'punctuation_marks'])
+        editor = get_editors(['space', 'number', 'arabic',
+                              'punctuation_marks'])
         obj.description = editor.run(obj.description)
 
-        editor.set_editors(['space'])
-        editor.escape_return = False
+        editor = get_editors(['space'], escape_return=False)
         obj.body = editor.run(obj.body)
 
         super().save_model(request, obj, form, change)
@@ -229,15 +277,15 @@ class ReportAdmin(BaseModelAdmin):
         if is_first_change:  # Inform user with email
             context = {'report': obj}
             email_template = 'emails/report_result.html'
-            message = BaseEmailMessage(request, context, email_template)
-            message.send([obj.reporter])
+            Email.objects.queue(request, context, email_template,
+                                [obj.reporter])
 
     def has_add_permission(self, request):
         return False
 
 
 @admin.register(Tag)
-class TagAdmin(BaseModelAdmin):
+class TagAdmin(TrigramSearchMixin, BaseModelAdmin):
     readonly_fields = ['updated_on', 'created_on']
     fieldsets = [
         [_('Main info'), {'fields': ['name', 'keyword', 'is_active']}],
@@ -249,13 +297,42 @@ class TagAdmin(BaseModelAdmin):
     prepopulated_fields = {'keyword': ['name']}
     object_tools = ['link_to_pages']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(has_pages=Exists(
+            Page.tags.through.objects.filter(tag=OuterRef('pk'))))
+
     def in_use(self, obj):
-        return bool(obj.pages.all().count())
+        return obj.has_pages
 
     in_use.boolean = True
     in_use.short_description = _('In use?')
+    in_use.admin_order_field = 'has_pages'
 
     def link_to_pages(self, obj):
         return f'{reverse("admin:web_page_changelist")}?q={obj.name}'
 
     link_to_pages.short_description = _('Pages')
+
+
+@admin.register(Email)
+class EmailAdmin(admin.ModelAdmin):
+    date_hierarchy = 'created_on'
+    readonly_fields = ['kind', 'subject', 'body', 'html', 'from_email', 'to',
+                       'attempts', 'sent_on', 'last_error', 'updated_on',
+                       'created_on']
+    fieldsets = [
+        [_('Main info'), {
+            'fields': ['kind', 'subject', 'from_email', 'to', 'body', 'html']
+        }],
+        [_('Delivery info'), {
+            'fields': ['status', 'attempts', 'next_attempt_on', 'sent_on',
+                       'last_error']
+        }],
+        [_('Important dates'), {'fields': ['updated_on', 'created_on']}]
+    ]
+    list_display = ['subject', 'kind', 'status', 'attempts', 'created_on']
+    list_filter = ['kind', 'status', 'created_on']
+    search_fields = ['subject', 'last_error']
+
+    def has_add_permission(self, request):
+        return False
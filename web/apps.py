@@ -5,3 +5,11 @@ from django.utils.translation import ugettext_lazy as _
 class WebConfig(AppConfig):
     name = 'web'
     verbose_name = _('Laum Project')
+
+    def ready(self):
+        from django.db.models import CharField, TextField
+
+        from .lookups import TrigramContains
+
+        CharField.register_lookup(TrigramContains)
+        TextField.register_lookup(TrigramContains)
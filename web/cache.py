@@ -0,0 +1,107 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+
+from .helpers import get_active_lang
+
+SEARCH_CACHE_VERSION_KEY = 'search:version'
+RANDOM_PAGES_POOL_KEY = 'random_pages:pool:{language}'
+PAGE_DETAIL_FRAGMENTS = ['page_detail', 'page_meta']
+
+
+def get_search_cache():
+    return caches[getattr(settings, 'SEARCH_CACHE_ALIAS', 'default')]
+
+
+def normalize_search_query(text):
+    return ' '.join(text.split()).lower()
+
+
+def get_search_cache_version():
+    cache = get_search_cache()
+    version = cache.get(SEARCH_CACHE_VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old keys.
+        cache.add(SEARCH_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(SEARCH_CACHE_VERSION_KEY)
+    return version
+
+
+def invalidate_search_cache():
+    """
+    Expire every cached search result by bumping the shared version.
+    """
+    cache = get_search_cache()
+    try:
+        cache.incr(SEARCH_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.add(SEARCH_CACHE_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def make_search_cache_key(text, language=None, **filters):
+    language = language or get_active_lang()
+    raw_key = '|'.join([normalize_search_query(text)] + [
+        f'{name}={value}' for name, value in sorted(filters.items())])
+    digest = hashlib.md5(raw_key.encode()).hexdigest()
+    return f'search:{get_search_cache_version()}:{language}:{digest}'
+
+
+def get_random_pages_pool_key(language=None):
+    language = language or get_active_lang()
+    return RANDOM_PAGES_POOL_KEY.format(language=language)
+
+
+def invalidate_random_pages_pool():
+    cache.delete_many([get_random_pages_pool_key(code)
+                       for code, name in settings.LANGUAGES])
+
+
+def get_page_detail_vary_on(page):
+    """
+    Return what the cached fragments of the page detail are keyed by.
+    """
+    return [page.pid, page.language, page.updated_on.isoformat()]
+
+
+def invalidate_page_detail_cache(page):
+    vary_on = get_page_detail_vary_on(page)
+    cache.delete_many([make_template_fragment_key(fragment_name, vary_on)
+                       for fragment_name in PAGE_DETAIL_FRAGMENTS])
+
+
+class SearchResult:
+    """
+    A sliceable list of pages backed by a cached, ranked list of pids.
+
+    Only the requested slice is fetched from the database, so it can be
+    passed to a `Paginator` in place of the ranked queryset.
+    """
+
+    def __init__(self, queryset, pids, last_modified=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.pids = pids
+        self.last_modified = last_modified
+
+    def __len__(self):
+        return len(self.pids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __bool__(self):
+        return bool(self.pids)
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            return self.queryset.get(pid=self.pids[k])
+
+        pids = self.pids[k]
+        pages = self.queryset.in_bulk(pids, field_name='pid')
+        return [pages[pid] for pid in pids if pid in pages]
+
+    def count(self):
+        return len(self.pids)
@@ -1,18 +1,37 @@
+from types import MappingProxyType
+
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
 
+# {(site pk, protocol): context}, filled as sites are requested.
+SITE_CONTEXT_CACHE = {}
+
+
+def clear_site_context_cache():
+    SITE_CONTEXT_CACHE.clear()
 
-def site_settings(request):
-    site = get_current_site(request)
-    protocol = 'https' if request.is_secure() else 'http'
-    base_url = f'{protocol}://{site.domain}'
-    static_url = base_url + getattr(settings, 'STATIC_URL', '')
 
-    site_context = getattr(settings, 'SITE_CONTEXT', {})
-    site_context.update({
-        'SITE_NAME': site.name,
-        'BASE_URL': base_url,
-        'STATIC_URL': static_url
-    })
+def get_site_context(site, protocol):
+    """
+    Return the read-only context of `site` for `protocol`, built once per
+    process.
+    """
+    key = (site.pk, protocol)
+    site_context = SITE_CONTEXT_CACHE.get(key)
+
+    if site_context is None:
+        base_url = f'{protocol}://{site.domain}'
+        site_context = MappingProxyType({
+            **getattr(settings, 'SITE_CONTEXT', {}),
+            'SITE_NAME': site.name,
+            'BASE_URL': base_url,
+            'STATIC_URL': base_url + getattr(settings, 'STATIC_URL', '')
+        })
+        SITE_CONTEXT_CACHE[key] = site_context
 
     return site_context
+
+
+def site_settings(request):
+    protocol = 'https' if request.is_secure() else 'http'
+    return get_site_context(get_current_site(request), protocol)
@@ -1,8 +1,12 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.http import Http404
+from django.template.defaultfilters import filesizeformat
 from django.utils.translation import ugettext_lazy as _
 
 from .models import Page, Report
+from .thumbnails import downscale_image
 
 
 class SearchForm(forms.Form):
@@ -81,6 +85,30 @@ class PageForm(forms.ModelForm):
         }
         self.fields['author'].label = _('your email')
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+
+        max_size = getattr(settings, 'PAGE_IMAGE_MAX_SIZE', 10 * 1024 ** 2)
+        if image.size > max_size:
+            raise forms.ValidationError(
+                _('The image must be at most %(size)s.'),
+                code='image_too_large',
+                params={'size': filesizeformat(max_size)})
+
+        # Dimensions are read from the header, nothing is decoded yet.
+        width, height = image.image.size
+        if width * height > getattr(settings, 'PAGE_IMAGE_MAX_PIXELS',
+                                    24000000):
+            raise forms.ValidationError(
+                _('The image dimensions are too large.'),
+                code='image_too_large')
+
+        return downscale_image(
+            image, getattr(settings, 'PAGE_IMAGE_MAX_DIMENSION', 2048),
+            getattr(settings, 'THUMBNAIL_QUALITY', 85))
+
 
 class ReportForm(forms.ModelForm):
     class Meta:
@@ -1,5 +1,8 @@
 import random
+import re
 import string
+from contextvars import ContextVar
+from functools import lru_cache
 
 from django.conf import settings
 from django.utils.translation import get_language
@@ -12,30 +15,73 @@ def swap_prefix(string_, new, delimiter='_'):
     return new_string
 
 
+def make_rid(pid, pk):
+    return swap_prefix(f'{pid}_{pk}', settings.RID_PREFIX)
+
+
 def id_generator(n=12):
     return ''.join(random.choices(string.ascii_letters + string.digits, k=n))
 
 
+# Language of the current request and its normalized code, set by
+# `ActiveLanguageMiddleware`.
+request_lang = ContextVar('request_lang', default=None)
+
+
+@lru_cache(maxsize=None)
+def normalize_lang(language):
+    return language.split('-')[0]
+
+
 def get_active_lang():
     language = get_language()
-    if not language:
-        language = settings.LANGUAGE_CODE
-    return language.split('-')[0]
+    stored = request_lang.get()
+    if stored is not None and stored[0] == language:
+        return stored[1]
+    # Outside a request, or overridden during it.
+    return normalize_lang(language or settings.LANGUAGE_CODE)
 
 
-def switch_lang_code(path_, language):
-    lang_codes = [c for (c, name) in settings.LANGUAGES]
+@lru_cache(maxsize=None)
+def get_lang_prefix_re():
+    """
+    Return a regex matching the language prefix of a URL path.
+    """
+    lang_codes = '|'.join(re.escape(c) for (c, name) in settings.LANGUAGES)
+    return re.compile(f'^/({lang_codes})(?=/|$)')
+
+
+def make_lang_path(path_, language, prefix_default_language=True):
+    """
+    Return `path_` with its language prefix replaced for `language`, or
+    removed for the default language if `prefix_default_language` is not
+    set, as `i18n_patterns` serves it.
+    """
+    match = get_lang_prefix_re().match(path_)
+    path_without_prefix = path_[match.end():] if match else path_
+    if not prefix_default_language and \
+            language == normalize_lang(settings.LANGUAGE_CODE):
+        return path_without_prefix or '/'
+    return f'/{language}{path_without_prefix}'
+
 
+@lru_cache(maxsize=1024)
+def get_alternate_paths(path_, prefix_default_language=True):
+    """
+    Return `(language, path)` of `path_` in every language, memoized per
+    path.
+    """
     if path_ == '':
         raise Exception('URL path for language switch is empty')
     elif path_[0] != '/':
         raise Exception('URL path for language switch does not start with "/"')
-    elif language not in lang_codes:
-        raise Exception('%s is not a supported language code' % language)
-
-    parts = path_.split('/')
-    if parts[1] in lang_codes:
-        parts[1] = language
-    else:
-        parts[0] = '/' + language
-    return '/'.join(parts)
+
+    return tuple((code, make_lang_path(path_, code, prefix_default_language))
+                 for (code, name) in settings.LANGUAGES)
+
+
+def switch_lang_code(path_, language):
+    for code, alternate_path in get_alternate_paths(path_):
+        if code == language:
+            return alternate_path
+    raise Exception('%s is not a supported language code' % language)
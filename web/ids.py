@@ -0,0 +1,119 @@
+import os
+import secrets
+import string
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+TIME_LENGTH = 6
+COUNTER_LENGTH = 6
+MAX_COUNTER = len(ALPHABET) ** COUNTER_LENGTH
+SAVE_ATTEMPTS = 3
+
+
+def encode(number, length):
+    """
+    Encode `number` in base 62 with exactly `length` characters, keeping the
+    numeric order in the lexical order.
+    """
+    chars = []
+    for _ in range(length):
+        number, remainder = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+class IdAllocator:
+    """
+    Allocate `<prefix>_XXXXXXXXXXXX` ids without a database lookup.
+
+    The postfix is the current second followed by a per process counter
+    that starts at a random point every second, so ids are time ordered and
+    two processes only collide if their counters meet in the same second.
+    """
+
+    def __init__(self, prefix_setting):
+        self.prefix_setting = prefix_setting
+        self.lock = threading.Lock()
+        self.pid = None
+        self.second = None
+        self.counter = 0
+
+    def __call__(self):
+        return self.allocate(1)[0]
+
+    def reset(self, second):
+        self.second = second
+        # Leave half of the range free for the rest of the second.
+        self.counter = secrets.randbelow(MAX_COUNTER // 2)
+
+    def reserve(self, n):
+        """
+        Return the second and the first counter of `n` unused ids.
+        """
+        with self.lock:
+            now = int(time.time())
+
+            if self.pid != os.getpid():
+                # A forked child must not repeat the counter of its parent.
+                self.pid = os.getpid()
+                self.reset(now)
+            elif now > self.second:
+                self.reset(now)
+
+            if self.counter + n > MAX_COUNTER:
+                # Borrow the next second rather than wrap the counter.
+                self.reset(self.second + 1)
+
+            start = self.counter
+            self.counter += n
+            return self.second, start
+
+    def allocate(self, n):
+        """
+        Return a list of `n` unique ids, e.g. for `bulk_create()`.
+        """
+        if n > MAX_COUNTER // 2:
+            raise ValueError(f'Cannot allocate more than {MAX_COUNTER // 2} '
+                             f'ids at once.')
+
+        second, start = self.reserve(n)
+        prefix = f'{getattr(settings, self.prefix_setting)}_' \
+                 f'{encode(second, TIME_LENGTH)}'
+        return [f'{prefix}{encode(counter, COUNTER_LENGTH)}'
+                for counter in range(start, start + n)]
+
+
+gid_allocator = IdAllocator('GID_PREFIX')
+pid_allocator = IdAllocator('PID_PREFIX')
+
+
+def save_with_new_id(save, instance, field_name, allocator, is_id_exist,
+                     allocated_id, **kwargs):
+    """
+    Call `save` for a new `instance` and, if its id is already taken but is
+    the `allocated_id` it was given by default, retry with a newly
+    allocated id. A taken id that was set explicitly, or any other
+    integrity error, is raised.
+    """
+    if not instance._state.adding:
+        return save(**kwargs)
+
+    if instance._meta.pk.attname == field_name:
+        # Never update another row that has the same primary key.
+        kwargs.setdefault('force_insert', True)
+
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic(using=kwargs.get('using')):
+                return save(**kwargs)
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS or \
+                    getattr(instance, field_name) != allocated_id or \
+                    not is_id_exist(allocated_id):
+                raise
+            allocated_id = allocator()
+            setattr(instance, field_name, allocated_id)
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+MISSING = object()
+
+_samples = defaultdict(deque)
+_samples_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """
+    What one request spent on queries, template rendering and the cache.
+    """
+
+    def __init__(self):
+        self.started_on = time.perf_counter()
+        self.total_ms = 0
+        self.queries = 0
+        self.db_ms = 0
+        self.template_ms = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_cache_call = False
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started_on = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started_on) * 1000
+
+    @contextmanager
+    def record_queries(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self.execute_wrapper))
+            yield
+
+    @contextmanager
+    def record_cache(self):
+        """
+        Count the hits and misses of `get()` and `get_many()` on every
+        cache. Cache objects belong to the thread, so they are patched for
+        this request only.
+        """
+        patched_caches = [caches[alias] for alias in settings.CACHES]
+
+        for cache in patched_caches:
+            cache.get = self.count_get(cache.get)
+            cache.get_many = self.count_get_many(cache.get_many)
+        try:
+            yield
+        finally:
+            for cache in patched_caches:
+                del cache.get, cache.get_many
+
+    def count_get(self, get):
+        def counted_get(key, default=None, **kwargs):
+            if self.in_cache_call:
+                return get(key, default, **kwargs)
+
+            value = get(key, MISSING, **kwargs)
+            if value is MISSING:
+                self.cache_misses += 1
+                return default
+            self.cache_hits += 1
+            return value
+        return counted_get
+
+    def count_get_many(self, get_many):
+        def counted_get_many(keys, **kwargs):
+            keys = list(keys)
+            # Backends may implement it with `get()`, count keys once.
+            self.in_cache_call = True
+            try:
+                values = get_many(keys, **kwargs)
+            finally:
+                self.in_cache_call = False
+            self.cache_hits += len(values)
+            self.cache_misses += len(keys) - len(values)
+            return values
+        return counted_get_many
+
+    def record_render(self, response):
+        """
+        Time the rendering of a `TemplateResponse`, which happens after the
+        view returned it.
+        """
+        render = response.render
+
+        def timed_render():
+            started_on = time.perf_counter()
+            try:
+                return render()
+            finally:
+                self.template_ms += (time.perf_counter() - started_on) * 1000
+
+        response.render = timed_render
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started_on) * 1000
+
+    def get_server_timing(self):
+        return ', '.join([
+            f'db;desc="{self.queries} queries";dur={self.db_ms:.1f}',
+            f'tpl;desc="Template";dur={self.template_ms:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;desc="Total";dur={self.total_ms:.1f}',
+        ])
+
+
+def record_sample(view_name, metrics):
+    """
+    Keep `metrics` in the rolling window of `view_name`, which holds the
+    last `INSTRUMENTATION_WINDOW` samples of each view.
+    """
+    window = getattr(settings, 'INSTRUMENTATION_WINDOW', 1000)
+    sample = (metrics.total_ms, metrics.queries, metrics.db_ms,
+              metrics.template_ms, metrics.cache_hits, metrics.cache_misses)
+
+    with _samples_lock:
+        samples = _samples[view_name]
+        if samples.maxlen != window:
+            samples = _samples[view_name] = deque(samples, maxlen=window)
+        samples.append(sample)
+
+
+def clear_samples():
+    with _samples_lock:
+        _samples.clear()
+
+
+def percentile(sorted_values, percent):
+    """
+    Return the nearest-rank `percent` percentile of `sorted_values`.
+    """
+    rank = max(round(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def get_stats():
+    """
+    Return the statistics of the samples kept for each view, slowest
+    median first.
+    """
+    with _samples_lock:
+        views_samples = {view_name: list(samples)
+                         for view_name, samples in _samples.items()}
+
+    stats = []
+    for view_name, samples in views_samples.items():
+        count = len(samples)
+        totals_ms = sorted(sample[0] for sample in samples)
+        totals = [sum(values) for values in zip(*samples)]
+        cache_calls = totals[4] + totals[5]
+        stats.append({
+            'view': view_name,
+            'samples': count,
+            'p50_ms': round(percentile(totals_ms, 50), 1),
+            'p90_ms': round(percentile(totals_ms, 90), 1),
+            'p99_ms': round(percentile(totals_ms, 99), 1),
+            'queries': round(totals[1] / count, 1),
+            'db_ms': round(totals[2] / count, 1),
+            'template_ms': round(totals[3] / count, 1),
+            'cache_hit_ratio': round(totals[4] / cache_calls, 3)
+            if cache_calls else None,
+        })
+
+    return sorted(stats, key=lambda view_stats: -view_stats['p50_ms'])
@@ -0,0 +1,52 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+INDEXES_STATS_QUERY = '''
+    SELECT s.relname, s.indexrelname, s.idx_scan,
+           pg_relation_size(s.indexrelid), i.indisunique OR i.indisprimary
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.relname = ANY(%s)
+    ORDER BY s.relname, s.idx_scan, s.indexrelname
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report the unused indexes of the web tables from the ' \
+           'PostgreSQL statistics, counted since their last reset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-scans', type=int, default=0,
+                            help='Report indexes scanned at most this many '
+                                 'times as unused.')
+        parser.add_argument('--all', action='store_true',
+                            help='List every index, not only the unused.')
+
+    def handle(self, *args, **options):
+        tables = [model._meta.db_table
+                  for model in apps.get_app_config('web').get_models(
+                      include_auto_created=True)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(INDEXES_STATS_QUERY, [tables])
+            rows = cursor.fetchall()
+
+        unused_count = unused_size = 0
+
+        for table, index, scans, size, is_constraint in rows:
+            # Unique and primary key indexes enforce constraints, so are
+            # never reported as unused.
+            is_unused = scans <= options['max_scans'] and not is_constraint
+            if is_unused:
+                unused_count += 1
+                unused_size += size
+
+            if is_unused or options['all']:
+                status = 'unused' if is_unused else 'used'
+                self.stdout.write(f'{table}.{index}: {scans} scan(s), '
+                                  f'{size // 1024} KiB, {status}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{unused_count} unused index(es) using '
+            f'{unused_size // 1024} KiB.'))
@@ -0,0 +1,263 @@
+import json
+import math
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from io import StringIO
+from itertools import cycle
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from web.cache import invalidate_random_pages_pool, invalidate_search_cache
+from web.ids import gid_allocator, pid_allocator
+from web.instrumentation import percentile
+from web.models import Group, Page, Report, Tag, User
+from web.persian_editors import EDITORS, get_editors
+from web.views import PageListView
+
+WORDS = {
+    'en': ['python', 'linux', 'django', 'history', 'novel', 'river',
+           'mountain', 'poet', 'city', 'war', 'music', 'science', 'painter',
+           'king', 'queen', 'bridge', 'museum', 'theatre', 'island',
+           'empire'],
+    'fa': ['تاريخ', 'شاعر', 'كتاب', 'رود', 'کوه', 'شهر', 'جنگ', 'موسیقی',
+           'دانش', 'نقاش', 'پادشاه', 'ملکه', 'پل', 'موزه', 'تئاتر', 'جزیره',
+           'امپراتوری', 'رمان', '۱۳۹۸', '2020'],
+}
+SEARCH_TERMS = ['python', 'histroy', 'mount', 'poet city', 'nothing']
+LIST_TERM = 'python'
+ADMIN_CHANGELISTS = ['admin:web_page_changelist', 'admin:web_group_changelist',
+                     'admin:web_report_changelist', 'admin:web_tag_changelist']
+BENCHMARKS = ['search', 'random_pages', 'page_detail', 'page_list', 'sitemap',
+              'admin_changelists', 'persian_editors']
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True,
+            check=True, cwd=getattr(settings, 'BASE_DIR', None),
+            text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic corpus and measure the latency and queries of ' \
+           'the hot paths, as JSON. Nothing is kept in the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=2000,
+                            help='Number of pages seeded, spread over the '
+                                 'languages. Zero benchmarks the existing '
+                                 'pages.')
+        parser.add_argument('--tags', type=int, default=200,
+                            help='Number of tags seeded.')
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Number of measured runs of each '
+                                 'benchmark.')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Number of runs before measuring.')
+        parser.add_argument('--only', nargs='+', choices=BENCHMARKS,
+                            metavar='NAME',
+                            help=f'Run only the given benchmarks, of '
+                                 f'{", ".join(BENCHMARKS)}.')
+        parser.add_argument('--host', default='testserver',
+                            help='Host of the requests, allowed while '
+                                 'benchmarking.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the synthetic corpus.')
+        parser.add_argument('--output', default='-',
+                            help='File the results are written to, the '
+                                 'standard output by default.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.host = options['host']
+        self.client = Client(HTTP_HOST=self.host)
+        results = {}
+
+        with transaction.atomic(), \
+                tempfile.TemporaryDirectory() as sitemaps_output, \
+                override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS,
+                                                 self.host]):
+            try:
+                if options['pages']:
+                    self.seed(options['pages'], options['tags'])
+
+                user = User.objects.create_superuser(
+                    f'benchmark{time.time_ns()}@example.com', None)
+                self.client.force_login(user)
+                pages = list(Page.objects.all_active().order_by('?')[:100])
+                if not pages:
+                    raise CommandError('There is no active page in the '
+                                       'active language.')
+
+                benchmarks = self.get_benchmarks(pages, sitemaps_output)
+                for name in options['only'] or BENCHMARKS:
+                    results[name] = self.measure(
+                        benchmarks[name], options['iterations'],
+                        options['warmup'])
+                    self.stderr.write(
+                        f'{name}: p50 {results[name]["p50_ms"]:.2f} ms, '
+                        f'{results[name]["queries"]} queries')
+            finally:
+                transaction.set_rollback(True)
+                # Cached results may refer to the rolled back pages.
+                invalidate_search_cache()
+                invalidate_random_pages_pool()
+
+        report = {
+            'revision': get_revision(),
+            'created_on': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {name: options[name] for name in [
+                'pages', 'tags', 'iterations', 'warmup', 'seed']},
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+
+    def seed(self, pages_count, tags_count):
+        """
+        Create the tags, the groups and the pages in every language, in
+        bulk, with what their signals would have computed.
+        """
+        languages = [code for code, name in settings.LANGUAGES]
+        words = {code: WORDS.get(code, WORDS['en']) for code in languages}
+        started_on = time.monotonic()
+
+        tags = Tag.objects.bulk_create([
+            Tag(name=f'{self.random.choice(WORDS["en"])}-{i}',
+                keyword=f'tag-{i}', language=self.random.choice(languages),
+                is_active=self.random.random() < 0.95)
+            for i in range(tags_count)])
+
+        # A group has the same page in each language.
+        groups_count = pages_count // len(languages)
+        groups = Group.objects.bulk_create([
+            Group(gid=gid) for gid in gid_allocator.allocate(groups_count)])
+        pages_groups = [(group, language) for group in groups
+                        for language in languages]
+        pages_groups += [(None, self.random.choice(languages))
+                         for i in range(pages_count - len(pages_groups))]
+
+        pages = []
+        for (group, language), pid in zip(
+                pages_groups, pid_allocator.allocate(pages_count)):
+            language_words = words[language]
+            pages.append(Page(
+                pid=pid, group=group, language=language,
+                title=' '.join(self.random.sample(language_words, 2)),
+                subtitle=' '.join(self.random.sample(language_words, 3)),
+                content=' '.join(self.random.choices(language_words, k=60)),
+                event=' '.join(self.random.sample(language_words, 2)),
+                is_active=self.random.random() < 0.9))
+        pages = Page.objects.bulk_create(pages)
+
+        page_tag_model = Page.tags.through
+        page_tag_model.objects.bulk_create([
+            page_tag_model(page_id=page.pk, tag_id=tag.pk)
+            for page in pages for tag in self.random.sample(
+                tags, min(3, len(tags)))])
+        Report.objects.bulk_create([
+            Report(page_id=page.pid, body='Typo in the title',
+                   reporter='reporter@example.com', language=page.language)
+            for page in self.random.sample(pages, len(pages) // 10)])
+
+        Page.objects.filter(
+            pk__in=[page.pk for page in pages]).update_search_vector()
+        Group.objects.filter(
+            pk__in=[group.pk for group in groups]).update_titles()
+        invalidate_search_cache()
+        invalidate_random_pages_pool()
+
+        self.stderr.write(f'{pages_count} page(s), {groups_count} group(s) '
+                          f'and {tags_count} tag(s) seeded in '
+                          f'{time.monotonic() - started_on:.1f}s.')
+
+    def get_benchmarks(self, pages, sitemaps_output):
+        """
+        Return the benchmarks by name, each a callable for one run.
+        """
+        search_terms = cycle(SEARCH_TERMS)
+        results_count = Page.objects.search(LIST_TERM).count()
+        list_pages = cycle(range(1, min(math.ceil(
+            results_count / PageListView.paginate_by), 5) + 1) or [1])
+        detail_pages = cycle(pages)
+        changelists = cycle(ADMIN_CHANGELISTS)
+        editors = get_editors(EDITORS)
+        texts = cycle([' '.join(self.random.choices(WORDS['fa'], k=150)),
+                       ' '.join(self.random.choices(WORDS['en'], k=150))])
+
+        def get(url):
+            response = self.client.get(url, secure=True)
+            assert response.status_code == 200, (url, response.status_code)
+
+        def page_detail():
+            page = next(detail_pages)
+            with translation.override(page.language):
+                get(page.get_absolute_url())
+
+        return {
+            'search': lambda: list(Page.objects.search(next(search_terms))),
+            'random_pages': Page.objects.get_random_pages,
+            'page_detail': page_detail,
+            'page_list': lambda: get(
+                f'{reverse("web:page-list")}?q={LIST_TERM}'
+                f'&page={next(list_pages)}'),
+            'sitemap': lambda: call_command(
+                'generate_sitemaps', domain=self.host,
+                output=sitemaps_output, stdout=StringIO()),
+            'admin_changelists': lambda: get(reverse(next(changelists))),
+            'persian_editors': lambda: editors.run(next(texts)),
+        }
+
+    @staticmethod
+    def measure(benchmark, iterations, warmup):
+        """
+        Run `benchmark` and return the percentiles of its latency with the
+        median number of queries of a run.
+        """
+        for i in range(warmup):
+            benchmark()
+
+        durations = []
+        queries = []
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                started_on = time.perf_counter()
+                benchmark()
+                durations.append((time.perf_counter() - started_on) * 1000)
+            queries.append(len(context.captured_queries))
+
+        durations.sort()
+        queries.sort()
+        return {
+            'iterations': iterations,
+            'min_ms': round(durations[0], 3),
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p90_ms': round(percentile(durations, 90), 3),
+            'p99_ms': round(percentile(durations, 99), 3),
+            'max_ms': round(durations[-1], 3),
+            'mean_ms': round(sum(durations) / iterations, 3),
+            'queries': percentile(queries, 50),
+            'max_queries': queries[-1],
+        }
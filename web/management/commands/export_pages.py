@@ -0,0 +1,85 @@
+import json
+import sys
+import time
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+
+from web.models import Group, Page, Tag
+
+TAG_FIELDS = ['name', 'keyword', 'language', 'is_active']
+PAGE_FIELDS = ['pid', 'language', 'group', 'title', 'subtitle', 'content',
+               'event', 'image', 'image_caption', 'reference', 'website',
+               'author', 'is_active']
+
+
+class Command(BaseCommand):
+    help = 'Export the pages, groups and tags as JSON lines, one record ' \
+           'per line, for import_pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='File the records are written to, the '
+                                 'standard output by default.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of rows read from the database at '
+                                 'once.')
+
+    def handle(self, *args, **options):
+        started_on = time.monotonic()
+
+        if options['output'] == '-':
+            counts = self.export(sys.stdout, options['batch_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                counts = self.export(file, options['batch_size'])
+
+        elapsed = time.monotonic() - started_on
+        # Keep the summary out of the records written to the output.
+        self.stderr.write(self.style.SUCCESS(
+            f'{counts["page"]} page(s), {counts["group"]} group(s) and '
+            f'{counts["tag"]} tag(s) exported in {elapsed:.1f}s '
+            f'({counts["page"] / max(elapsed, 0.001):.0f} pages/s).'))
+
+    def export(self, file, batch_size):
+        counts = dict.fromkeys(['tag', 'group', 'page'], 0)
+
+        for record in self.get_records(batch_size):
+            file.write(json.dumps(record, ensure_ascii=False))
+            file.write('\n')
+            counts[record['type']] += 1
+
+        return counts
+
+    def get_records(self, batch_size):
+        """
+        Yield the tags, the groups, then the pages with the names of their
+        tags. Every query streams rows through a server-side cursor.
+        """
+        for tag in Tag.objects.order_by('pk').values(*TAG_FIELDS).iterator(
+                chunk_size=batch_size):
+            yield {'type': 'tag', **tag}
+
+        for gid in Group.objects.order_by('pk').values_list(
+                'gid', flat=True).iterator(chunk_size=batch_size):
+            yield {'type': 'group', 'gid': gid}
+
+        # Relations are streamed in page order along with the pages, as
+        # `prefetch_related()` is ignored by `iterator()`.
+        pages = Page.objects.order_by('pk').values(
+            'pk', *PAGE_FIELDS).iterator(chunk_size=batch_size)
+        relations = Page.tags.through.objects.order_by(
+            'page_id', 'tag_id').values_list('page_id', 'tag__name')
+        relations = groupby(relations.iterator(chunk_size=batch_size),
+                            key=lambda relation: relation[0])
+        page_id, page_tags = next(relations, (None, ()))
+
+        for page in pages:
+            pk = page.pop('pk')
+            tags = []
+            while page_id is not None and page_id <= pk:
+                if page_id == pk:
+                    tags = [name for page_pk, name in page_tags]
+                page_id, page_tags = next(relations, (None, ()))
+
+            yield {'type': 'page', **page, 'tags': tags}
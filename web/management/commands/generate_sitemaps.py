@@ -0,0 +1,128 @@
+import glob
+import gzip
+import os
+from itertools import count, islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand
+from django.db.models import QuerySet
+
+from web.sitemaps import (SITEMAP_INDEX_FILENAME, get_sitemaps,
+                          get_sitemaps_url)
+
+SITEMAP_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+                 '<{tag} ' \
+                 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAP_FILENAME = 'sitemap-{section}-{number}.xml.gz'
+
+
+def get_sitemap_attribute(sitemap, name, item):
+    attribute = getattr(sitemap, name, None)
+    return attribute(item) if callable(attribute) else attribute
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and the gzipped section sitemaps as ' \
+           'static files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domain',
+                            help='Domain of the URLs, the current site by '
+                                 'default.')
+        parser.add_argument('--output',
+                            help='Directory the sitemaps are written to, '
+                                 'SITEMAP_ROOT by default.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of rows read from the database at '
+                                 'once.')
+
+    def handle(self, *args, **options):
+        domain = options['domain'] or Site.objects.get_current().domain
+        output = options['output'] or getattr(
+            settings, 'SITEMAP_ROOT',
+            os.path.join(settings.STATIC_ROOT, 'sitemaps'))
+        os.makedirs(output, exist_ok=True)
+
+        sitemaps_url = get_sitemaps_url(domain)
+        files = []
+        urls_count = 0
+
+        for section, sitemap in get_sitemaps().items():
+            items = sitemap.items()
+            if isinstance(items, QuerySet):
+                items = items.iterator(chunk_size=options['batch_size'])
+            items = iter(items)
+
+            for number in count(1):
+                chunk = list(islice(items, sitemap.limit))
+                if not chunk:
+                    break
+                filename = SITEMAP_FILENAME.format(section=section,
+                                                   number=number)
+                lastmod = self.write_sitemap(os.path.join(output, filename),
+                                             sitemap, chunk, domain)
+                files.append((filename, lastmod))
+                urls_count += len(chunk)
+
+        self.write_index(os.path.join(output, SITEMAP_INDEX_FILENAME),
+                         files, sitemaps_url)
+
+        # Remove the sections that no longer exist.
+        filenames = {filename for filename, lastmod in files}
+        for path in glob.glob(os.path.join(output, 'sitemap-*.xml.gz')):
+            if os.path.basename(path) not in filenames:
+                os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{urls_count} url(s) written to {len(files)} sitemap(s).'))
+
+    def write_sitemap(self, path, sitemap, items, domain):
+        """
+        Write `items` to the gzipped sitemap at `path` and return their last
+        modification date.
+        """
+        protocol = sitemap.protocol or 'http'
+        last_lastmod = None
+
+        with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8') as file:
+            file.write(SITEMAP_HEADER.format(tag='urlset'))
+
+            for item in items:
+                location = get_sitemap_attribute(sitemap, 'location', item)
+                lastmod = get_sitemap_attribute(sitemap, 'lastmod', item)
+                changefreq = get_sitemap_attribute(sitemap, 'changefreq',
+                                                   item)
+                priority = get_sitemap_attribute(sitemap, 'priority', item)
+
+                file.write(f'<url><loc>{escape(f"{protocol}://{domain}")}'
+                           f'{escape(location)}</loc>')
+                if lastmod:
+                    file.write(f'<lastmod>{lastmod:%Y-%m-%d}</lastmod>')
+                    last_lastmod = max(lastmod, last_lastmod or lastmod)
+                if changefreq:
+                    file.write(f'<changefreq>{changefreq}</changefreq>')
+                if priority is not None:
+                    file.write(f'<priority>{priority:.1f}</priority>')
+                file.write('</url>\n')
+
+            file.write('</urlset>\n')
+
+        os.replace(f'{path}.tmp', path)
+        return last_lastmod
+
+    def write_index(self, path, files, sitemaps_url):
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            file.write(SITEMAP_HEADER.format(tag='sitemapindex'))
+
+            for filename, lastmod in files:
+                file.write(f'<sitemap><loc>{escape(sitemaps_url)}'
+                           f'{filename}</loc>')
+                if lastmod:
+                    file.write(f'<lastmod>{lastmod:%Y-%m-%d}</lastmod>')
+                file.write('</sitemap>\n')
+
+            file.write('</sitemapindex>\n')
+
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,81 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from web.cache import invalidate_random_pages_pool, invalidate_search_cache
+from web.models import Page
+from web.thumbnails import generate_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Generate the thumbnails of the page images in every configured ' \
+           'size, with WebP variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Number of pages handled per transaction.')
+        parser.add_argument('--force', action='store_true',
+                            help='Generate the thumbnails of every page '
+                                 'again, e.g. after adding a size.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep generating until interrupted.')
+        parser.add_argument('--interval', type=int, default=10,
+                            help='Seconds to wait for new images in loop.')
+
+    def handle(self, *args, **options):
+        if options['force']:
+            Page.objects.exclude(thumbnails={}).update(thumbnails={})
+
+        while True:
+            generated_count, failed_count = self.generate_batch(
+                options['batch_size'])
+
+            if generated_count or failed_count:
+                # Fragments and validators are keyed by `updated_on`, but
+                # cached search results keep the old one.
+                invalidate_search_cache()
+                invalidate_random_pages_pool()
+                self.stdout.write(self.style.SUCCESS(
+                    f'{generated_count} image(s) thumbnailed, '
+                    f'{failed_count} image(s) failed.'))
+
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+    def generate_batch(self, batch_size):
+        """
+        Generate the thumbnails of a batch of pages waiting for them and
+        return the count of generated and failed pages. Rows stay locked
+        until done, so workers can run in parallel.
+        """
+        with transaction.atomic():
+            pages = list(Page.objects.exclude(image='').filter(
+                thumbnails={}).select_for_update(skip_locked=True).only(
+                'pk', 'image', 'image_width', 'image_height').order_by(
+                'pk')[:batch_size])
+
+            generated_count = failed_count = 0
+
+            for page in pages:
+                try:
+                    page.thumbnails = generate_thumbnails(page.image)
+                except Exception as e:
+                    logger.exception('Thumbnail generation failed.')
+                    # Keep the error, so the page isn't retried forever.
+                    page.thumbnails = {'source': page.image.name,
+                                       'error': str(e)}
+                    failed_count += 1
+                else:
+                    generated_count += 1
+                page.updated_on = timezone.now()
+
+            Page.objects.bulk_update(pages, ['thumbnails', 'updated_on'])
+
+        return generated_count, failed_count
@@ -0,0 +1,245 @@
+import json
+import os
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from web.cache import invalidate_random_pages_pool, invalidate_search_cache
+from web.ids import pid_allocator
+from web.models import Group, Page, Tag
+from web.persian_editors import normalize_many
+from .export_pages import PAGE_FIELDS, TAG_FIELDS
+from .normalize_pages import PAGE_FIELDS_EDITORS
+
+
+class Command(BaseCommand):
+    help = 'Import the pages, groups and tags of a JSON lines file written ' \
+           'by export_pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File the records are read from.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of records written per '
+                                 'transaction.')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of worker processes for '
+                                 'normalizing.')
+        parser.add_argument('--skip-normalize', action='store_true',
+                            help='Do not normalize the text fields with '
+                                 'PersianEditors.')
+        parser.add_argument('--checkpoint',
+                            help='File the count of imported lines and the '
+                                 'pids allocated for the next batch are '
+                                 'kept in, "<path>.checkpoint" by default.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and import from the '
+                                 'first line.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        batch_size = options['batch_size']
+        done, pids = (0, {}) if options['restart'] else \
+            self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Resuming after line {done}.')
+
+        processes = options['processes']
+        pool = Pool(processes) if processes > 1 else None
+        counts = dict.fromkeys(['tag', 'group', 'page', 'skipped'], 0)
+        started_on = time.monotonic()
+
+        try:
+            with open(path, encoding='utf-8') as file:
+                lines = islice(file, done, None)
+
+                while True:
+                    chunk = list(islice(lines, batch_size))
+                    if not chunk:
+                        break
+
+                    records = self.parse(chunk, done)
+                    # Kept before the batch is committed, so if it is
+                    # imported again after a crash, its pages get the same
+                    # pids and those already committed are skipped.
+                    pids = self.assign_pids(records, pids)
+                    self.write_checkpoint(checkpoint, done, pids)
+
+                    with transaction.atomic():
+                        for name, count in self.import_batch(
+                                [record for number, record in records],
+                                pool, not options['skip_normalize']).items():
+                            counts[name] += count
+
+                    done += len(chunk)
+                    pids = {}
+                    self.write_checkpoint(checkpoint, done, pids)
+
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{done} line(s) imported.')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        # `bulk_create()` sends no signals, so expire what they would.
+        invalidate_search_cache()
+        invalidate_random_pages_pool()
+
+        elapsed = time.monotonic() - started_on
+        self.stdout.write(self.style.SUCCESS(
+            f'{counts["page"]} page(s), {counts["group"]} group(s) and '
+            f'{counts["tag"]} tag(s) imported, {counts["skipped"]} existing '
+            f'page(s) skipped in {elapsed:.1f}s '
+            f'({counts["page"] / max(elapsed, 0.001):.0f} pages/s).'))
+
+    @staticmethod
+    def read_checkpoint(checkpoint):
+        """
+        Return the count of imported lines and the pids allocated for the
+        pages of the next lines, by line number.
+        """
+        try:
+            with open(checkpoint) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0, {}
+        return state['done'], state['pids']
+
+    @staticmethod
+    def write_checkpoint(checkpoint, done, pids):
+        with open(f'{checkpoint}.tmp', 'w') as file:
+            json.dump({'done': done, 'pids': pids}, file)
+        os.replace(f'{checkpoint}.tmp', checkpoint)
+
+    @staticmethod
+    def assign_pids(records, pids):
+        """
+        Give the page records with no pid the one allocated for their line
+        in `pids`, or a new one, and return the pids of `records` by line.
+        """
+        numbers = [str(number) for number, record in records
+                   if record['type'] == 'page' and not record.get('pid')]
+        new_pids = iter(pid_allocator.allocate(
+            sum(1 for number in numbers if number not in pids)))
+        pids = {number: pids.get(number) or next(new_pids)
+                for number in numbers}
+
+        for number, record in records:
+            if str(number) in pids:
+                record['pid'] = pids[str(number)]
+        return pids
+
+    @staticmethod
+    def parse(lines, first_line):
+        """
+        Return the records of `lines` with their line number.
+        """
+        records = []
+        for number, line in enumerate(lines, first_line + 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise CommandError(f'Line {number}: {e}')
+            if record.get('type') not in ['tag', 'group', 'page']:
+                raise CommandError(f'Line {number}: unknown record type.')
+            records.append((number, record))
+        return records
+
+    def import_batch(self, records, pool, normalize):
+        """
+        Create the records of a batch in bulk and return the count of
+        created and skipped rows of each type.
+        """
+        tags = {record['name']: self.make_tag(**{
+            field: record[field] for field in TAG_FIELDS if field in record})
+            for record in records if record['type'] == 'tag'}
+        groups = {record['gid']: Group(gid=record['gid'])
+                  for record in records if record['type'] == 'group'}
+        pages_records = [record for record in records
+                         if record['type'] == 'page']
+
+        # Rows imported before are left as they are.
+        for name in Tag.objects.filter(name__in=tags).values_list(
+                'name', flat=True):
+            del tags[name]
+        for gid in Group.objects.filter(gid__in=groups).values_list(
+                'gid', flat=True):
+            del groups[gid]
+
+        Tag.objects.bulk_create(tags.values())
+        Group.objects.bulk_create(groups.values())
+        pages_count, new_tags_count = self.import_pages(pages_records, pool,
+                                                        normalize)
+
+        return {'tag': len(tags) + new_tags_count, 'group': len(groups),
+                'page': pages_count,
+                'skipped': len(pages_records) - pages_count}
+
+    @staticmethod
+    def make_tag(name, keyword='', **kwargs):
+        keyword = keyword or slugify(name, allow_unicode=True)
+        return Tag(name=name, keyword=keyword, **kwargs)
+
+    def import_pages(self, records, pool, normalize):
+        """
+        Create the new pages of `records` with their tags and return the
+        count of created pages and of tags created for them.
+        """
+        existing_pids = set(Page.objects.filter(
+            pid__in=[record['pid'] for record in records]).values_list(
+            'pid', flat=True))
+        records = [record for record in records
+                   if record['pid'] not in existing_pids]
+        if not records:
+            return 0, 0
+
+        pages = [Page(**{field: record[field] for field in PAGE_FIELDS
+                         if field in record and field != 'group'},
+                      group_id=record.get('group'))
+                 for record in records]
+
+        if normalize:
+            for field, (editors, escape_return) in \
+                    PAGE_FIELDS_EDITORS.items():
+                texts = [getattr(page, field) for page in pages]
+                for page, text in zip(pages, normalize_many(
+                        texts, editors, escape_return=escape_return,
+                        pool=pool)):
+                    setattr(page, field, text)
+
+        Page.objects.bulk_create(pages)
+
+        # Resolve the tags of the whole batch at once.
+        names = {name for record in records
+                 for name in record.get('tags', [])}
+        tags_pk = dict(Tag.objects.filter(name__in=names).values_list(
+            'name', 'pk'))
+        missing_names = names - set(tags_pk)
+        if missing_names:
+            Tag.objects.bulk_create([self.make_tag(name)
+                                     for name in missing_names])
+            tags_pk.update(Tag.objects.filter(
+                name__in=missing_names).values_list('name', 'pk'))
+
+        page_tag_model = Page.tags.through
+        page_tag_model.objects.bulk_create([
+            page_tag_model(page_id=page.pk, tag_id=tags_pk[name])
+            for page, record in zip(pages, records)
+            for name in record.get('tags', [])])
+
+        # `bulk_create()` sends no signals, so refresh what they would.
+        pages_pk = [page.pk for page in pages]
+        Page.objects.filter(pk__in=pages_pk).update_search_vector()
+        Group.objects.filter(pages__pk__in=pages_pk).update_titles()
+
+        return len(pages), len(missing_names)
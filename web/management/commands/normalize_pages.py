@@ -0,0 +1,112 @@
+from itertools import islice
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from web.cache import invalidate_search_cache
+from web.models import Group, Page, Report
+from web.persian_editors import EDITORS, normalize_many
+
+# Same editors the admin applies on save: {field: (editors, escape_return)}
+PAGE_FIELDS_EDITORS = {
+    'title': (EDITORS, True),
+    'subtitle': (EDITORS, True),
+    'content': (EDITORS, True),
+    'event': (EDITORS, True),
+    'image_caption': (EDITORS, True),
+}
+REPORT_FIELDS_EDITORS = {
+    'description': (EDITORS, True),
+    'body': (('space',), False),
+}
+
+
+class Command(BaseCommand):
+    help = 'Normalize the text fields of pages and reports with ' \
+           'PersianEditors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of rows read and written at once.')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of worker processes for editing.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would change.')
+        parser.add_argument('--skip-reports', action='store_true',
+                            help='Do not normalize reports.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        pool = Pool(processes) if processes > 1 else None
+
+        try:
+            changed_pages_pk = self.normalize(
+                Page.objects.order_by('pk'), PAGE_FIELDS_EDITORS,
+                options['batch_size'], options['dry_run'], pool)
+            self.report('page', changed_pages_pk, options['dry_run'])
+
+            if not options['skip_reports']:
+                changed_reports_pk = self.normalize(
+                    Report.objects.order_by('pk'), REPORT_FIELDS_EDITORS,
+                    options['batch_size'], options['dry_run'], pool)
+                self.report('report', changed_reports_pk, options['dry_run'])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if changed_pages_pk and not options['dry_run']:
+            # `bulk_update()` sends no signals, so refresh what they would.
+            for i in range(0, len(changed_pages_pk), options['batch_size']):
+                pages_pk = changed_pages_pk[i:i + options['batch_size']]
+                Page.objects.filter(pk__in=pages_pk).update_search_vector()
+                Group.objects.filter(pages__pk__in=pages_pk).update_titles()
+            invalidate_search_cache()
+
+    def normalize(self, queryset, fields_editors, batch_size, dry_run, pool):
+        """
+        Normalize the rows of `queryset` chunk by chunk and return the pk of
+        the changed rows.
+        """
+        fields = list(fields_editors)
+        rows = queryset.only('pk', *fields).iterator(chunk_size=batch_size)
+        changed_rows_pk = []
+
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+
+            changed_rows = {}
+
+            for field, (editors, escape_return) in fields_editors.items():
+                texts = [getattr(row, field) for row in chunk]
+                edited_texts = normalize_many(
+                    texts, editors, escape_return=escape_return, pool=pool)
+
+                for row, text, edited_text in zip(chunk, texts,
+                                                  edited_texts):
+                    if text != edited_text:
+                        setattr(row, field, edited_text)
+                        changed_rows[row.pk] = row
+
+            if changed_rows and not dry_run:
+                # `bulk_update()` skips `auto_now`, but cached fragments and
+                # validators are keyed by `updated_on`.
+                updated_on = timezone.now()
+                for row in changed_rows.values():
+                    row.updated_on = updated_on
+                queryset.model.objects.bulk_update(changed_rows.values(),
+                                                   [*fields, 'updated_on'])
+
+            changed_rows_pk.extend(changed_rows)
+
+        return changed_rows_pk
+
+    def report(self, name, changed_rows_pk, dry_run):
+        if dry_run:
+            message = f'{len(changed_rows_pk)} {name}(s) would be normalized.'
+        else:
+            message = f'{len(changed_rows_pk)} {name}(s) normalized.'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,126 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+
+from web.models import Email
+
+
+class Command(BaseCommand):
+    help = 'Send the queued emails in batches over one connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of emails sent per connection.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Number of attempts before giving up.')
+        parser.add_argument('--retry-delay', type=int, default=60,
+                            help='Seconds before the first retry, doubled '
+                                 'on each next one.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sending until interrupted.')
+        parser.add_argument('--interval', type=int, default=10,
+                            help='Seconds to wait for new emails in loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent_count, failed_count = self.send_batch(
+                options['batch_size'], options['max_attempts'],
+                options['retry_delay'])
+
+            if sent_count or failed_count:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{sent_count} email(s) sent, '
+                    f'{failed_count} email(s) failed.'))
+
+            if not options['loop']:
+                break
+            if not sent_count and not failed_count:
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size, max_attempts, retry_delay):
+        """
+        Send a batch of due emails and return the count of sent and failed
+        emails. Rows stay locked until sent, so workers can run in parallel.
+        """
+        with transaction.atomic():
+            emails = list(Email.objects.due().select_for_update(
+                skip_locked=True).order_by('next_attempt_on')[:batch_size])
+            if not emails:
+                return 0, 0
+
+            sent_count = failed_count = 0
+            connection = get_connection()
+
+            try:
+                connection.open()
+            except Exception as e:
+                for email in emails:
+                    self.retry(email, e, max_attempts, retry_delay)
+                failed_count = len(emails)
+            else:
+                try:
+                    for message, group in self.get_messages(emails):
+                        try:
+                            connection.send_messages([message])
+                        except Exception as e:
+                            for email in group:
+                                self.retry(email, e, max_attempts,
+                                           retry_delay)
+                            failed_count += len(group)
+                        else:
+                            for email in group:
+                                email.status = Email.STATUS_IS_SENT
+                                email.sent_on = timezone.now()
+                            sent_count += len(group)
+                finally:
+                    connection.close()
+
+            for email in emails:
+                email.updated_on = timezone.now()
+            Email.objects.bulk_update(emails, [
+                'status', 'attempts', 'next_attempt_on', 'sent_on',
+                'last_error', 'updated_on'])
+
+        return sent_count, failed_count
+
+    def get_messages(self, emails):
+        """
+        Yield each message with the emails it delivers. Notifications for
+        the same recipients are merged into one digest.
+        """
+        notifications = {}
+
+        for email in emails:
+            if email.kind == Email.KIND_IS_NOTIFICATION:
+                key = (email.from_email, tuple(sorted(email.to)))
+                notifications.setdefault(key, []).append(email)
+            else:
+                yield email.get_message(), [email]
+
+        for (from_email, to), group in notifications.items():
+            if len(group) == 1:
+                yield group[0].get_message(), group
+                continue
+
+            digest = Email(
+                subject=_('%(count)d new notifications') % {
+                    'count': len(group)},
+                body='\n\n'.join(f'{email.subject}\n{email.body}'
+                                 for email in group),
+                from_email=from_email, to=list(to))
+            yield digest.get_message(), group
+
+    def retry(self, email, error, max_attempts, retry_delay):
+        email.attempts += 1
+        email.last_error = str(error)
+
+        if email.attempts >= max_attempts:
+            email.status = Email.STATUS_IS_FAILED
+        else:
+            email.next_attempt_on = timezone.now() + timedelta(
+                seconds=retry_delay * 2 ** (email.attempts - 1))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from web.models import Page
+
+
+class Command(BaseCommand):
+    help = 'Backfill the stored search vector of pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of pages updated per query.')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only update pages without search vector.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pages = Page.objects.order_by('pk')
+
+        if options['missing']:
+            pages = pages.filter(search_vector__isnull=True)
+
+        pages_pk = pages.values_list('pk', flat=True)
+        updated_count = 0
+        last_pk = 0
+
+        while True:
+            batch = list(pages_pk.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            updated_count += Page.objects.filter(
+                pk__in=batch).update_search_vector()
+            last_pk = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Search vector of {updated_count} page(s) updated.'))
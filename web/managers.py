@@ -1,13 +1,37 @@
 import random
 
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.postgres.aggregates import StringAgg
 from django.contrib.postgres.search import (SearchQuery, SearchRank,
-                                            SearchVector)
-from django.db import models
+                                            SearchVector, TrigramSimilarity)
+from django.core.cache import cache
+from django.db import connections, models
+from django.db.models import F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
-
-from .helpers import get_active_lang
+from templated_mail.mail import BaseEmailMessage
+
+from .cache import (SearchResult, get_random_pages_pool_key,
+                    get_search_cache, make_search_cache_key)
+from .helpers import get_active_lang, make_rid
+
+# Each key is a random id in the range of the active pages, probed through
+# the `web_page_active_lang_idx` partial index for the next active page.
+RANDOM_PAGES_QUERY = '''
+    SELECT DISTINCT page.id
+    FROM (SELECT low + floor(random() * (high - low + 1))::integer AS pk
+          FROM (SELECT min(id) AS low, max(id) AS high
+                FROM {table}
+                WHERE is_active AND language = %(language)s) AS bounds,
+               generate_series(1, %(size)s)) AS key
+    CROSS JOIN LATERAL (
+        SELECT id FROM {table}
+        WHERE is_active AND language = %(language)s AND id >= key.pk
+        ORDER BY language, id
+        LIMIT 1) AS page
+'''
 
 
 class LanguageQueryset(models.QuerySet):
@@ -19,6 +43,50 @@ class PageQueryset(LanguageQueryset):
     def all_active(self):
         return self.filter(is_active=True, language=get_active_lang())
 
+    def with_active_tags(self):
+        """
+        Prefetch the active tags of pages into `active_tags`.
+        """
+        tag_model = self.model._meta.get_field('tags').related_model
+        return self.prefetch_related(Prefetch(
+            'tags', queryset=tag_model.objects.filter(
+                is_active=True).order_by('pk'),
+            to_attr='active_tags'))
+
+    def update_search_vector(self):
+        """
+        Recompute the stored `search_vector` of the pages in this queryset.
+        """
+        page_tags = self.model.tags.through.objects.filter(
+            page=OuterRef('pk')).order_by().values('page')
+        tags_query = page_tags.annotate(
+            names=StringAgg('tag__name', delimiter=' ')).values('names')
+        tags_name = Subquery(tags_query, output_field=models.TextField())
+        vector = SearchVector('title', weight='A') + \
+                 SearchVector('subtitle', weight='B') + \
+                 SearchVector(tags_name, weight='C') + \
+                 SearchVector('content', 'event', 'image_caption', weight='D')
+        return self.update(search_vector=vector)
+
+
+class GroupQueryset(models.QuerySet):
+    def update_titles(self):
+        """
+        Recompute the stored `titles` of the groups in this queryset from
+        the title of their page in each language.
+        """
+        page_model = self.model._meta.get_field('pages').related_model
+        groups = {group.pk: group for group in self.only('pk')}
+        for group in groups.values():
+            group.titles = {}
+
+        pages = page_model.objects.filter(group__in=list(groups))
+        for group_id, language, title in pages.values_list(
+                'group_id', 'language', 'title'):
+            groups[group_id].titles[language] = title
+
+        return self.model.objects.bulk_update(groups.values(), ['titles'])
+
 
 class ReportQueryset(LanguageQueryset):
     pass
@@ -60,44 +128,151 @@ class UserManager(BaseUserManager):
 
 class GroupManager(models.Manager):
 
+    def get_queryset(self):
+        return GroupQueryset(model=self.model, using=self._db,
+                             hints=self._hints)
+
+    def update_titles(self):
+        return self.get_queryset().update_titles()
+
     def is_gid_exist(self, gid):
         return self.filter(gid=gid).exists()
 
 
-class PageManager(models.Manager):
+class LanguageManager(models.Manager):
+    """
+    A manager of `queryset_class`, scoped to the active language if
+    `localized` is set.
+    """
+    queryset_class = LanguageQueryset
+
+    def __init__(self, localized=False):
+        super().__init__()
+        self.localized = localized
 
     def get_queryset(self):
-        return PageQueryset(model=self.model, using=self._db,
-                            hints=self._hints)
+        queryset = self.queryset_class(model=self.model, using=self._db,
+                                       hints=self._hints)
+        return queryset.active_language() if self.localized else queryset
 
     def active_language(self):
         return self.get_queryset().active_language()
 
+
+class PageManager(LanguageManager):
+    queryset_class = PageQueryset
+
     def all_active(self):
         return self.get_queryset().all_active()
 
+    def update_search_vector(self):
+        return self.get_queryset().update_search_vector()
+
     def search(self, text):
-        vector = SearchVector('title', weight='A') + \
-                 SearchVector('subtitle', weight='B') + \
-                 SearchVector(StringAgg('tags__name', delimiter=' '),
-                              weight='C') + \
-                 SearchVector('content', 'event', 'image_caption', weight='D')
+        """
+        Rank the full-text matches first, then the pages whose title,
+        subtitle or tags contain `text` or are similar to it, which covers
+        partial words and typos. Every condition is served by an index.
+        """
         query = SearchQuery(text, search_type='plain')
-        rank = SearchRank(vector, query)
-        return self.all_active().annotate(
-            rank=rank).filter(rank__gte=0.01).order_by('-rank')
+        rank = SearchRank(F('search_vector'), query)
+        similarity = Greatest(TrigramSimilarity('title', text),
+                              TrigramSimilarity('subtitle', text))
+
+        tag_model = self.model._meta.get_field('tags').related_model
+        tags = tag_model.objects.filter(
+            Q(name__trigram_similar=text) | Q(name__trigram_contains=text),
+            is_active=True)
+        tagged_pages = self.model.tags.through.objects.filter(
+            tag__in=tags).values('page_id')
+        matched_pages = self.get_queryset().annotate(rank=rank).filter(
+            Q(search_vector=query, rank__gte=0.01) |
+            Q(title__trigram_similar=text) |
+            Q(title__trigram_contains=text) |
+            Q(subtitle__trigram_similar=text) |
+            Q(subtitle__trigram_contains=text)).values('pk')
+
+        # A `UNION` rather than an `OR` of the tag subquery, which would
+        # be checked row by row instead of combining the indexes.
+        return self.all_active().filter(
+            pk__in=matched_pages.union(tagged_pages)).annotate(
+            rank=rank, similarity=similarity).order_by(
+            # Pages without a search vector yet have no rank.
+            F('rank').desc(nulls_last=True), '-similarity', 'pk')
+
+    def cached_search(self, text, **filters):
+        """
+        Same as `search()` but the ranked pids are kept in the search cache,
+        so each page of results only fetches its own slice of pages.
+        """
+        search_cache = get_search_cache()
+        cache_key = make_search_cache_key(text, **filters)
+        cached_result = search_cache.get(cache_key)
+
+        if cached_result is None:
+            ranked_pages = list(self.search(text).filter(
+                **filters).values_list('pid', 'updated_on'))
+            pids = [pid for pid, updated_on in ranked_pages]
+            last_modified = max(
+                [updated_on for pid, updated_on in ranked_pages], default=None)
+            cached_result = (pids, last_modified)
+            timeout = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 60 * 60)
+            search_cache.set(cache_key, cached_result, timeout)
+
+        pids, last_modified = cached_result
+        return SearchResult(self.all_active().with_active_tags(), pids,
+                            last_modified)
+
+    def sample_active_pages_pk(self, size):
+        """
+        Return at most `size` distinct random ids of the active pages of
+        the active language, without sorting or scanning them.
+
+        Pages that follow a gap in the ids are more likely to be chosen,
+        which is good enough to vary the pages shown.
+        """
+        query = RANDOM_PAGES_QUERY.format(table=self.model._meta.db_table)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(query, {'language': get_active_lang(),
+                                   'size': size})
+            return [pk for pk, in cursor.fetchall()]
+
+    def get_random_pages_pool(self):
+        """
+        Return the sampling epoch and a cached pool of active page ids for
+        the active language.
+
+        The pool holds every active page while there are at most
+        `RANDOM_PAGES_POOL_SIZE`, otherwise a random sample of that size.
+        It is refreshed every `RANDOM_PAGES_POOL_TIMEOUT` seconds or when a
+        page is added, removed, activated or moves to another language.
+        """
+        cache_key = get_random_pages_pool_key()
+        pages_pool = cache.get(cache_key)
+
+        if pages_pool is None:
+            pool_size = getattr(settings, 'RANDOM_PAGES_POOL_SIZE', 1000)
+            pages_pk = list(self.all_active().order_by().values_list(
+                'pk', flat=True)[:pool_size + 1])
+            if len(pages_pk) > pool_size:
+                pages_pk = self.sample_active_pages_pk(pool_size)
+            pages_pool = (timezone.now(), pages_pk)
+            cache.set(cache_key, pages_pool,
+                      getattr(settings, 'RANDOM_PAGES_POOL_TIMEOUT', 60 * 5))
 
-    def get_random_pages(self):
-        all_pages = self.all_active()
-        pages_sample_list = list(all_pages.values_list('pk', flat=True))
-        max_random_page_count = 3  # TODO: Make this variable dynamic.
+        return pages_pool
 
-        if len(pages_sample_list) < 3:
-            max_random_page_count = len(pages_sample_list)
+    def get_random_pages(self, count=None):
+        if count is None:
+            count = getattr(settings, 'RANDOM_PAGES_COUNT', 3)
+
+        epoch, pages_sample_list = self.get_random_pages_pool()
+        max_random_page_count = min(count, len(pages_sample_list))
 
         random_pages_id = random.sample(pages_sample_list,
                                         max_random_page_count)
-        random_pages_list = list(all_pages.filter(pk__in=random_pages_id))
+        random_pages_list = list(
+            self.all_active().filter(pk__in=random_pages_id))
 
         random.shuffle(random_pages_list)
 
@@ -107,20 +282,48 @@ class PageManager(models.Manager):
         return self.filter(pid=pid).exists()
 
 
-class ReportManager(models.Manager):
+class ReportManager(LanguageManager):
+    queryset_class = ReportQueryset
 
-    def get_queryset(self):
-        return PageQueryset(model=self.model, using=self._db,
-                            hints=self._hints)
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Create the reports and assign their `rid`, which `post_save` does
+        for a single report, in one more query.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        reports = [r for r in objs if r.pk is not None and not r.rid]
 
-    def active_language(self):
-        return self.get_queryset().active_language()
+        for report in reports:
+            report.rid = make_rid(report.page_id, report.pk)
+        if reports:
+            self.bulk_update(reports, ['rid'])
 
+        return objs
 
-class TagManager(models.Manager):
 
-    def get_queryset(self):
-        return TagQueryset(model=self.model, using=self._db, hints=self._hints)
+class TagManager(LanguageManager):
+    queryset_class = TagQueryset
 
-    def active_language(self):
-        return self.get_queryset().active_language()
+
+class EmailManager(models.Manager):
+
+    def queue(self, request, context, template_name, to, kind=None):
+        """
+        Render the templated email now and store it to be sent later by the
+        `send_emails` command.
+        """
+        to = [address for address in to if address]
+        if not to:
+            return None
+
+        message = BaseEmailMessage(request, context, template_name)
+        message.render()
+
+        return self.create(kind=kind or self.model.KIND_IS_MESSAGE,
+                           subject=message.subject, body=message.body,
+                           html=message.html or '',
+                           from_email=settings.DEFAULT_FROM_EMAIL, to=to)
+
+    def due(self):
+        return self.filter(status=self.model.STATUS_IS_PENDING,
+                           next_attempt_on__lte=timezone.now())
@@ -0,0 +1,60 @@
+import random
+
+from django.conf import settings
+from django.utils.translation import get_language
+
+from .helpers import get_active_lang, request_lang
+from .instrumentation import RequestMetrics, record_sample
+
+
+class ActiveLanguageMiddleware:
+    """
+    Resolve the normalized language once per request, after
+    `LocaleMiddleware` activated it, for `get_active_lang()` and
+    `request.active_language`. A language activated later in the request
+    takes over.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.active_language = get_active_lang()
+        token = request_lang.set((get_language(), request.active_language))
+        try:
+            return self.get_response(request)
+        finally:
+            request_lang.reset(token)
+
+
+class InstrumentationMiddleware:
+    """
+    Record the queries, template rendering and cache use of a sample of
+    requests, a fraction given by `INSTRUMENTATION_SAMPLE_RATE`, for the
+    admin stats and a `Server-Timing` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+        if not sample_rate or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        metrics = request.instrumentation = RequestMetrics()
+        with metrics.record_queries(), metrics.record_cache():
+            response = self.get_response(request)
+        metrics.finish()
+
+        match = request.resolver_match
+        record_sample(match.view_name if match else '<unresolved>', metrics)
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True):
+            response['Server-Timing'] = metrics.get_server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, 'instrumentation', None)
+        if metrics is not None:
+            metrics.record_render(response)
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.11 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='web_page_search_vector_gin'),
+        ),
+    ]
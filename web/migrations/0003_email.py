@@ -0,0 +1,42 @@
+# Generated by Django 2.2.11 on 2026-10-18 11:38
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0002_page_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Email',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_on', models.DateTimeField(auto_now=True, verbose_name='updated on')),
+                ('created_on', models.DateTimeField(auto_now_add=True, verbose_name='created on')),
+                ('kind', models.CharField(choices=[('message', 'Message'), ('notification', 'Notification')], default='message', help_text='Notifications for the same recipients are sent as one digest.', max_length=32, verbose_name='kind')),
+                ('subject', models.CharField(max_length=255, verbose_name='subject')),
+                ('body', models.TextField(blank=True, verbose_name='body')),
+                ('html', models.TextField(blank=True, verbose_name='HTML body')),
+                ('from_email', models.CharField(blank=True, max_length=255, verbose_name='from email')),
+                ('to', django.contrib.postgres.fields.ArrayField(base_field=models.EmailField(max_length=254), size=None, verbose_name='to')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=32, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt on')),
+                ('sent_on', models.DateTimeField(blank=True, null=True, verbose_name='sent on')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+            ],
+            options={
+                'verbose_name': 'email',
+                'verbose_name_plural': 'emails',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(status='pending'), fields=['next_attempt_on'], name='web_email_pending_next_idx'),
+        ),
+    ]
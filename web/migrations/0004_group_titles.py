@@ -0,0 +1,35 @@
+# Generated by Django 2.2.11 on 2026-10-18 11:45
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+def populate_titles(apps, schema_editor):
+    Group = apps.get_model('web', 'Group')
+    Page = apps.get_model('web', 'Page')
+
+    groups = {group.pk: group for group in Group.objects.only('pk')}
+    for group in groups.values():
+        group.titles = {}
+
+    for group_id, language, title in Page.objects.filter(
+            group__isnull=False).values_list('group_id', 'language', 'title'):
+        groups[group_id].titles[language] = title
+
+    Group.objects.bulk_update(groups.values(), ['titles'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0003_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='titles',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False, help_text='Title of the group page in each language.', verbose_name='titles'),
+        ),
+        migrations.RunPython(populate_titles, migrations.RunPython.noop),
+    ]
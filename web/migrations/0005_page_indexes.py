@@ -0,0 +1,53 @@
+# Generated by Django 2.2.11 on 2026-10-18 11:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0004_group_titles'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='page',
+            name='content',
+            field=models.TextField(max_length=1024, verbose_name='content'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='event',
+            field=models.CharField(blank=True, help_text='Date of an important event for the subject entered along with the place of occurrence.', max_length=128, verbose_name='event'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='group',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='web.Group', verbose_name='group'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='image_caption',
+            field=models.CharField(blank=True, help_text='A brief description of the location and history of the photo.', max_length=128, verbose_name='image caption'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='subtitle',
+            field=models.CharField(blank=True, max_length=128, verbose_name='subtitle'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='title',
+            field=models.CharField(max_length=128, verbose_name='title'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='keyword',
+            field=models.SlugField(allow_unicode=True, db_index=False, verbose_name='keyword'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(condition=models.Q(is_active=True), fields=['language', 'id'], name='web_page_active_lang_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.11 on 2026-10-18 11:57
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0006_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='thumbnails',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False, help_text='Thumbnails of the image in each size, generated in the background.', verbose_name='thumbnails'),
+        ),
+    ]
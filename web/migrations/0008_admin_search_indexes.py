@@ -0,0 +1,29 @@
+# Generated by Django 2.2.11 on 2026-10-18 12:23
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+# The codes of `settings.LANGUAGES` when this migration was written. The
+# group admin searches a title annotation for each configured language, so
+# a new language needs a migration that adds its index the same way.
+LANGUAGES = ['en', 'fa']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0007_page_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['keyword'], name='web_tag_keyword_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f"CREATE INDEX web_group_title_{code}_trgm ON web_group "
+            f"USING gin ((titles ->> '{code}') gin_trgm_ops)",
+            f"DROP INDEX web_group_title_{code}_trgm",
+        ) for code in LANGUAGES
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.11 on 2026-10-18 12:41
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def populate_image_dimensions(apps, schema_editor):
+    Page = apps.get_model('web', 'Page')
+
+    # Names only, as loading a page without its dimensions reads the image.
+    pages = Page.objects.exclude(image='').values_list('pk', 'image')
+    for pk, name in pages.iterator():
+        try:
+            with default_storage.open(name) as image_file:
+                width, height = get_image_dimensions(image_file)
+        except OSError:
+            continue
+        Page.objects.filter(pk=pk).update(image_width=width,
+                                          image_height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0008_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='image height'),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='image width'),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', upload_to='images', verbose_name='image', width_field='image_width'),
+        ),
+        migrations.RunPython(populate_image_dimensions,
+                             migrations.RunPython.noop),
+    ]
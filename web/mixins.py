@@ -1,6 +1,12 @@
+import hashlib
+
 from django.conf import settings
 from django.http import JsonResponse
-from templated_mail.mail import BaseEmailMessage
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.translation import get_language
+
+from .models import Email
 
 
 class AjaxableResponseMixin:
@@ -27,13 +33,13 @@ class AjaxableResponseMixin:
             email_template = f'emails/new_{object_type}.html'
             to = form.cleaned_data.get('reporter') or form.cleaned_data.get(
                 'author')
-            message = BaseEmailMessage(self.request, context, email_template)
-            message.send([to])
+            Email.objects.queue(self.request, context, email_template, [to])
 
             # Inform admins with an email
-            message.template_name = \
-                f'emails/new_{object_type}_notification.html'
-            message.send([a[1] for a in settings.ADMINS])
+            email_template = f'emails/new_{object_type}_notification.html'
+            Email.objects.queue(self.request, context, email_template,
+                                [a[1] for a in settings.ADMINS],
+                                kind=Email.KIND_IS_NOTIFICATION)
 
             return JsonResponse({})
         else:
@@ -41,3 +47,54 @@ class AjaxableResponseMixin:
 
     def get_success_url(self):
         pass
+
+
+class ConditionalGetMixin:
+    """
+    Mixin to answer conditional GET requests with `304 Not Modified`.
+    Views must implement `get_last_modified()` and call
+    `get_conditional_response()` before building the context.
+    """
+
+    def get_last_modified(self):
+        raise NotImplementedError(
+            'subclasses of ConditionalGetMixin must provide a '
+            'get_last_modified() method')
+
+    def get_etag_vary_on(self):
+        """
+        Return the extra values the ETag depends on, besides the full path,
+        the language and the last modification time.
+        """
+        return []
+
+    def get_etag(self):
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            return None
+
+        raw_etag = ':'.join([self.request.get_full_path(), get_language(),
+                             last_modified.isoformat()] + [
+            str(value) for value in self.get_etag_vary_on()])
+        # Weak, since the body carries a new CSRF token on each render.
+        return f'W/"{hashlib.md5(raw_etag.encode()).hexdigest()}"'
+
+    def get_conditional_response(self):
+        """
+        Return a `304 Not Modified` response if the client copy is still
+        fresh, else `None`.
+        """
+        self.last_modified = self.get_last_modified()
+        self.etag = self.get_etag()
+        last_modified = self.last_modified and \
+            int(self.last_modified.timestamp())
+        return get_conditional_response(self.request, etag=self.etag,
+                                        last_modified=last_modified)
+
+    def set_validators(self, response):
+        if self.etag:
+            response['ETag'] = self.etag
+        if self.last_modified:
+            response['Last-Modified'] = http_date(
+                self.last_modified.timestamp())
+        return response
@@ -1,42 +1,188 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from .helpers import swap_prefix, id_generator, get_active_lang
+from .cache import (invalidate_page_detail_cache,
+                    invalidate_random_pages_pool, invalidate_search_cache)
+from .context_processors import clear_site_context_cache
+from .helpers import get_active_lang, make_lang_path, make_rid
+from .ids import gid_allocator, pid_allocator, save_with_new_id
 from .managers import UserManager, PageManager, GroupManager, ReportManager, \
-    TagManager
+    TagManager, EmailManager
 
 
 def generate_gid():
-    new_gid = None
-    while not new_gid:
-        postfix_string = id_generator()
-        new_gid = f'{settings.GID_PREFIX}_{postfix_string}'
-        if Group.objects.is_gid_exist(new_gid):
-            new_gid = None
-    return new_gid
+    return gid_allocator()
 
 
 def generate_pid():
-    new_pid = None
-    while not new_pid:
-        postfix_string = id_generator()
-        new_pid = f'{settings.PID_PREFIX}_{postfix_string}'
-        if Page.objects.is_pid_exist(new_pid):
-            new_pid = None
-    return new_pid
+    return pid_allocator()
 
 
 @receiver(post_save, sender='web.Report')
 def generate_rid(sender, instance=None, created=False, **kwargs):
-    if created:
-        instance.rid = swap_prefix(f'{instance.page.pid}_{instance.pk}',
-                                   settings.RID_PREFIX)
-        instance.save()
+    if created and not instance.rid:
+        # Write only the column, a second `save()` would send signals again.
+        instance.rid = make_rid(instance.page_id, instance.pk)
+        Report.objects.filter(pk=instance.pk).update(rid=instance.rid)
+
+
+# Fields that other rows or caches are derived from.
+PAGE_STATE_FIELDS = ['group_id', 'is_active', 'language', 'title',
+                     'subtitle', 'content', 'event', 'image_caption']
+
+
+@receiver(pre_save, sender='web.Page')
+def remember_page_state(sender, instance=None, raw=False, **kwargs):
+    instance._previous_values = None
+    if instance.pk and not raw:
+        instance._previous_values = Page.objects.filter(
+            pk=instance.pk).values(*PAGE_STATE_FIELDS).first()
+
+
+def has_page_changed(instance, *field_names):
+    """
+    Return whether any of `field_names` of the saved `instance` changed,
+    assuming they did if its previous values are unknown.
+    """
+    previous = getattr(instance, '_previous_values', None)
+    return previous is None or any(
+        getattr(instance, field_name) != previous[field_name]
+        for field_name in field_names)
+
+
+@receiver(pre_save, sender='web.Page')
+def expire_page_thumbnails(sender, instance=None, raw=False, **kwargs):
+    thumbnails = instance.thumbnails
+    if not raw and thumbnails and \
+            thumbnails.get('source') != instance.image.name:
+        # Left for `generate_thumbnails` to generate again.
+        instance.thumbnails = {}
+
+
+def refresh_group_titles(*groups_pk):
+    groups_pk = set(groups_pk) - {None}
+    if groups_pk:
+        Group.objects.filter(pk__in=groups_pk).update_titles()
+
+
+@receiver(post_save, sender='web.Page')
+def update_group_titles(sender, instance=None, **kwargs):
+    if has_page_changed(instance, 'group_id', 'language', 'title'):
+        # The page may leave its group, which keeps the old title
+        # otherwise.
+        previous = getattr(instance, '_previous_values', None) or {}
+        refresh_group_titles(instance.group_id, previous.get('group_id'))
+
+
+@receiver(post_delete, sender='web.Page')
+def update_deleted_page_group_titles(sender, instance=None, **kwargs):
+    refresh_group_titles(instance.group_id)
+
+
+@receiver(post_save, sender='web.Page')
+def update_page_search_vector(sender, instance=None, **kwargs):
+    # Tags are indexed too, but their changes are handled below.
+    if has_page_changed(instance, 'title', 'subtitle', 'content', 'event',
+                        'image_caption'):
+        Page.objects.filter(pk=instance.pk).update_search_vector()
+
+
+def refresh_tagged_pages(pages):
+    """
+    Refresh what depends on the tags of `pages`: the search vector and the
+    `updated_on` that validators and cached fragments are keyed by.
+    """
+    pages.update_search_vector()
+    pages.update(updated_on=timezone.now())
+
+
+@receiver(post_save, sender='web.Tag')
+def update_tag_pages(sender, instance=None, created=False, **kwargs):
+    if not created:
+        refresh_tagged_pages(instance.pages.all())
+
+
+@receiver(pre_delete, sender='web.Tag')
+def remember_tag_pages(sender, instance=None, **kwargs):
+    # Relations are deleted without `m2m_changed`, so remember the pages.
+    instance._deleted_pages_pk = list(
+        instance.pages.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender='web.Tag')
+def update_deleted_tag_pages(sender, instance=None, **kwargs):
+    refresh_tagged_pages(Page.objects.filter(
+        pk__in=getattr(instance, '_deleted_pages_pk', [])))
+
+
+@receiver(m2m_changed, sender='web.Page_tags')
+def update_page_tags(sender, instance=None, action=None, reverse=False,
+                     pk_set=None, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Relations are gone by `post_clear`, so remember the pages now.
+        instance._cleared_pages_pk = list(
+            instance.pages.values_list('pk', flat=True))
+        return
+
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+
+    if not reverse:
+        pages = Page.objects.filter(pk=instance.pk)
+    elif action == 'post_clear':
+        pages = Page.objects.filter(
+            pk__in=getattr(instance, '_cleared_pages_pk', []))
+    else:
+        pages = Page.objects.filter(pk__in=pk_set)
+
+    refresh_tagged_pages(pages)
+
+
+@receiver(post_delete, sender='web.Page')
+def expire_page_detail_cache(sender, instance=None, **kwargs):
+    invalidate_page_detail_cache(instance)
+
+
+@receiver(post_save, sender='web.Page')
+@receiver(post_delete, sender='web.Page')
+@receiver(post_save, sender='web.Tag')
+@receiver(post_delete, sender='web.Tag')
+@receiver(m2m_changed, sender='web.Page_tags')
+def expire_search_cache(sender, **kwargs):
+    invalidate_search_cache()
+
+
+@receiver(post_save, sender='web.Page')
+def expire_random_pages_pool(sender, instance=None, **kwargs):
+    # Other changes are picked up when the pool times out.
+    previous = getattr(instance, '_previous_values', None)
+    was_active = previous is not None and previous['is_active']
+    if has_page_changed(instance, 'is_active', 'language') and \
+            (instance.is_active or was_active):
+        invalidate_random_pages_pool()
+
+
+@receiver(post_delete, sender='web.Page')
+def expire_deleted_page_random_pages_pool(sender, instance=None, **kwargs):
+    if instance.is_active:
+        invalidate_random_pages_pool()
+
+
+@receiver(post_save, sender='sites.Site')
+@receiver(post_delete, sender='sites.Site')
+def expire_site_context(sender, **kwargs):
+    clear_site_context_cache()
 
 
 class User(AbstractUser):
@@ -77,40 +223,69 @@ class Group(BaseModel):
     language = None
     gid = models.CharField(_('global ID'), max_length=16, primary_key=True,
                            default=generate_gid, db_index=True, editable=False)
+    titles = JSONField(_('titles'), default=dict, blank=True, editable=False,
+                       help_text=_('Title of the group page in each '
+                                   'language.'))
 
     objects = GroupManager()
 
     class Meta:
         verbose_name = _('group')
         verbose_name_plural = _('groups')
+        # The title of each language has a trigram index too, created in
+        # the `0008_admin_search_indexes` migration as an expression index.
 
     def __str__(self):
-        page = self.pages.filter(language=get_active_lang()).first()
-        return page.title if page else self.gid
+        return self.titles.get(get_active_lang()) or self.gid
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only a gid given by default is replaced if it is taken.
+        self._allocated_gid = None if args or 'gid' in kwargs or \
+            'pk' in kwargs else self.gid
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        save_with_new_id(super().save, self, 'gid', gid_allocator,
+                         Group.objects.is_gid_exist,
+                         self._allocated_gid, force_insert=force_insert,
+                         force_update=force_update, using=using,
+                         update_fields=update_fields)
 
 
 class Page(BaseModel):
     group = models.ForeignKey('Group', verbose_name=_('group'),
                               on_delete=models.CASCADE, related_name='pages',
-                              null=True, blank=True)
+                              null=True, blank=True,
+                              # Covered by the `group, language` index
+                              db_index=False)
     tags = models.ManyToManyField('Tag', verbose_name=_('tags'), blank=True,
                                   related_name='pages',
                                   related_query_name='tag')
     pid = models.CharField(_('public ID'), max_length=16, unique=True,
                            default=generate_pid, db_index=True)
-    title = models.CharField(_('title'), max_length=128, db_index=True)
-    subtitle = models.CharField(_('subtitle'), max_length=128, blank=True,
-                                db_index=True)
-    content = models.TextField(_('content'), max_length=1024, db_index=True)
+    title = models.CharField(_('title'), max_length=128)
+    subtitle = models.CharField(_('subtitle'), max_length=128, blank=True)
+    content = models.TextField(_('content'), max_length=1024)
     event = models.CharField(_('event'), max_length=128, blank=True,
                              # TODO: Rename this field to `event_date`
                              help_text=_(
                                  'Date of an important event for the subject '
                                  'entered along with the place of '
-                                 'occurrence.'), db_index=True)
-    image = models.ImageField(_('image'), upload_to='images', blank=True)
+                                 'occurrence.'))
+    image = models.ImageField(_('image'), upload_to='images', blank=True,
+                              width_field='image_width',
+                              height_field='image_height')
+    image_width = models.PositiveIntegerField(_('image width'), null=True,
+                                              blank=True, editable=False)
+    image_height = models.PositiveIntegerField(_('image height'), null=True,
+                                               blank=True, editable=False)
+    thumbnails = JSONField(_('thumbnails'), default=dict, blank=True,
+                           editable=False, help_text=_(
+            'Thumbnails of the image in each size, generated in the '
+            'background.'))
     image_caption = models.CharField(_('image caption'), max_length=128,
-                                     blank=True, db_index=True, help_text=_(
+                                     blank=True, help_text=_(
             'A brief description of the location '
             'and history of the photo.'))
     reference = models.CharField(_('reference'), max_length=128, blank=True,
@@ -124,20 +299,63 @@ class Page(BaseModel):
                                     help_text=_(
                                         'Designate whether this page can '
                                         'include in the result list.'))
+    search_vector = SearchVectorField(_('search vector'), null=True,
+                                      editable=False)
 
     objects = PageManager()
+    localized = PageManager(localized=True)
 
     class Meta:
         verbose_name = _('page')
         verbose_name_plural = _('pages')
         unique_together = ('group', 'language')
+        indexes = [GinIndex(fields=['search_vector'],
+                            name='web_page_search_vector_gin'),
+                   GinIndex(fields=['title'], name='web_page_title_trgm',
+                            opclasses=['gin_trgm_ops']),
+                   GinIndex(fields=['subtitle'], name='web_page_subtitle_trgm',
+                            opclasses=['gin_trgm_ops']),
+                   # Active pages of a language, ordered as the sitemap.
+                   models.Index(fields=['language', 'id'],
+                                name='web_page_active_lang_idx',
+                                condition=models.Q(is_active=True))]
 
     def __str__(self):
         return self.title
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only a pid given by default is replaced if it is taken.
+        self._allocated_pid = None if args or 'pid' in kwargs else self.pid
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        save_with_new_id(super().save, self, 'pid', pid_allocator,
+                         Page.objects.is_pid_exist,
+                         self._allocated_pid, force_insert=force_insert,
+                         force_update=force_update, using=using,
+                         update_fields=update_fields)
+
     def get_absolute_url(self):
         return reverse('web:page-detail', args=[self.pid])
 
+    def get_alternate_paths(self):
+        """
+        Return `(language, path)` of this page and of the active pages of
+        its group in the other languages, as each pid has one language.
+        """
+        pages = [(self.language, self.pid)]
+        if self.group_id is not None:
+            pages += Page.objects.filter(
+                group_id=self.group_id, is_active=True).exclude(
+                pk=self.pk).values_list('language', 'pid')
+
+        return tuple(
+            (language, make_lang_path(
+                reverse('web:page-detail', args=[pid]), language,
+                prefix_default_language=False))
+            for language, pid in sorted(pages))
+
 
 class Report(BaseModel):
     STATUS_IS_PENDING = 'pending'
@@ -167,6 +385,7 @@ class Report(BaseModel):
             'This field only is set once.'))
 
     objects = ReportManager()
+    localized = ReportManager(localized=True)
 
     class Meta:
         verbose_name = _('report')
@@ -182,7 +401,8 @@ class Report(BaseModel):
 class Tag(BaseModel):
     name = models.CharField(_('name'), max_length=20, unique=True,
                             db_index=True)
-    keyword = models.SlugField(_('keyword'), allow_unicode=True, db_index=True)
+    keyword = models.SlugField(_('keyword'), allow_unicode=True,
+                               db_index=False)
     is_active = models.BooleanField(_('active status'), default=True,
                                     help_text=_(
                                         'Designate whether pages related to '
@@ -190,10 +410,73 @@ class Tag(BaseModel):
                                         'list.'))
 
     objects = TagManager()
+    localized = TagManager(localized=True)
 
     class Meta:
         verbose_name = _('tag')
         verbose_name_plural = _('tags')
+        indexes = [GinIndex(fields=['name'], name='web_tag_name_trgm',
+                            opclasses=['gin_trgm_ops']),
+                   GinIndex(fields=['keyword'], name='web_tag_keyword_trgm',
+                            opclasses=['gin_trgm_ops'])]
 
     def __str__(self):
         return self.name
+
+
+class Email(BaseModel):
+    KIND_IS_MESSAGE = 'message'
+    KIND_IS_NOTIFICATION = 'notification'
+    KIND_CHOICES = (
+        (KIND_IS_MESSAGE, _('Message')),
+        (KIND_IS_NOTIFICATION, _('Notification')),
+    )
+    STATUS_IS_PENDING = 'pending'
+    STATUS_IS_SENT = 'sent'
+    STATUS_IS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_IS_PENDING, _('Pending')),
+        (STATUS_IS_SENT, _('Sent')),
+        (STATUS_IS_FAILED, _('Failed')),
+    )
+
+    language = None
+    kind = models.CharField(_('kind'), max_length=32, choices=KIND_CHOICES,
+                            default=KIND_IS_MESSAGE, help_text=_(
+            'Notifications for the same recipients are sent as one digest.'))
+    subject = models.CharField(_('subject'), max_length=255)
+    body = models.TextField(_('body'), blank=True)
+    html = models.TextField(_('HTML body'), blank=True)
+    from_email = models.CharField(_('from email'), max_length=255,
+                                  blank=True)
+    to = ArrayField(models.EmailField(), verbose_name=_('to'))
+    status = models.CharField(_('status'), max_length=32,
+                              choices=STATUS_CHOICES,
+                              default=STATUS_IS_PENDING)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    next_attempt_on = models.DateTimeField(_('next attempt on'),
+                                           default=timezone.now)
+    sent_on = models.DateTimeField(_('sent on'), null=True, blank=True)
+    last_error = models.TextField(_('last error'), blank=True)
+
+    objects = EmailManager()
+
+    class Meta:
+        verbose_name = _('email')
+        verbose_name_plural = _('emails')
+        indexes = [models.Index(fields=['next_attempt_on'],
+                                name='web_email_pending_next_idx',
+                                condition=models.Q(status='pending'))]
+
+    def __str__(self):
+        return self.subject
+
+    def get_message(self, connection=None):
+        message = EmailMultiAlternatives(self.subject, self.body,
+                                         self.from_email or None, self.to,
+                                         connection=connection)
+        if self.html and self.html != self.body:
+            message.attach_alternative(self.html, 'text/html')
+        elif self.html:
+            message.content_subtype = 'html'
+        return message
@@ -1,164 +1,250 @@
 import re
+from functools import lru_cache, partial
+from itertools import cycle, groupby
+from operator import methodcaller
 
+EDITORS = ('space', 'number', 'arabic', 'punctuation_marks')
+PERSIAN_NUMS = ('۰', '۱', '۲', '۳', '۴', '۵', '۶', '۷', '۸', '۹')
+PERSIAN_PUNCTUATION_MARKS = frozenset(['!', '؟', '،', '»', ':', '؛', '.'])
 
-class PersianEditors(object):
-    _persian_punctuation_marks = ['!', '؟', '،', '»', ':', '؛', '.']
-    original_text = None
-    strip = True
-    escape_return = True
+RETURN_TABLE = str.maketrans({'\r': ' ', '\n': ' '})
+ARABIC_TABLE = str.maketrans({'ي': 'ی', 'ك': 'ک'})
+PUNCTUATION_MARKS_TABLE = str.maketrans({'?': '؟', ',': '،', ';': '؛'})
 
-    def __setattr__(self, key, value):
-        if key in ['_persian_punctuation_marks']:
-            raise AttributeError(
-                "%s is an immutable attribute." % key
-            )
-        else:
-            super().__setattr__(key, value)
+SPACE_SEQUENCE_RE = re.compile(' {2,}')
+SPACE_EDITOR_RE = re.compile('[ «%s]' % ''.join(PERSIAN_PUNCTUATION_MARKS))
 
-    def __init__(self, editors):
-        self._editing_text = None
-        self._edited_text = None
-        self._editors = None
-        self.set_editors(editors)
 
-    def _general_editor(self):
-        if self._editing_text is None:
-            raise AssertionError(
-                'Can\'t access directly to editors, '
-                'You must set editors attr then call `.run()`.'
-            )
+@lru_cache(maxsize=None)
+def get_number_table():
+    """
+    Map every Unicode decimal digit (what `\\d` matches) to its Persian digit.
+    """
+    return {code: PERSIAN_NUMS[int(chr(code))]
+            for code in range(0x110000) if chr(code).isdecimal()}
 
-        editing_text = self._editing_text
 
-        if self.strip:
-            editing_text = editing_text.strip()
+def edit_general(text, strip=True, escape_return=True):
+    if strip:
+        text = text.strip()
 
-        if self.escape_return:
-            editing_text = editing_text.replace('\r', ' ')
-            editing_text = editing_text.replace('\n', ' ')
+    if escape_return:
+        text = text.translate(RETURN_TABLE)
 
-        self._editing_text = editing_text
+    return text
 
-    def space_editor(self):
-        if self._editing_text is None:
-            raise AssertionError(
-                'Can\'t access directly to editors, '
-                'You must set editors attr then call `.run()`.'
-            )
 
-        editing_text = self._editing_text
-        punctuation_edited = ''
+def edit_spaces(text):
+    """
+    Remove space sequences and fix spaces around punctuation marks.
 
-        # Remove space sequence
-        while '  ' in editing_text:
-            editing_text = editing_text.replace('  ', ' ')
+    Every decision only looks at the neighbours of a space, `«` or mark in
+    the squeezed text, so the other characters are copied as they are.
+    """
+    text = SPACE_SEQUENCE_RE.sub(' ', text)
+    last_index = len(text) - 1
+    marks = PERSIAN_PUNCTUATION_MARKS
 
-        # Edit space after/before punctuation marks
-        for i, char in enumerate(editing_text):
-            if char in self._persian_punctuation_marks:
-                if editing_text[i - 1] == ' ':
-                    punctuation_edited = punctuation_edited[:-1]
+    def edit(match):
+        i = match.start()
+        char = match.group()
+        previous_char = text[i - 1]
+        next_char = text[i + 1] if i < last_index else None
 
-                try:
-                    if editing_text[i + 1] != ' ' and \
-                            editing_text[
-                                i + 1] not in self._persian_punctuation_marks:
-                        char = f'{char} '
-                except IndexError:
-                    pass
+        if char == ' ':
+            # Drop space after `«` and before marks.
+            if previous_char == '«' or next_char in marks:
+                return ''
+            return char
 
-            if editing_text[i - 1] != ' ' and char == '«':
-                char = f' {char}'
-
-            if char == ' ' and editing_text[i - 1] == '«':
+        if char == '«':
+            # `« ` followed by a mark loses the `«` along with the space.
+            if next_char == ' ' and i + 2 <= last_index and \
+                    text[i + 2] in marks:
                 char = ''
+            return char if previous_char == ' ' else f' {char}'
 
-            punctuation_edited += char
+        # Add space after marks.
+        if next_char is not None and next_char != ' ' and \
+                next_char not in marks:
+            return f'{char} '
+        return char
 
-        self._editing_text = punctuation_edited
+    return SPACE_EDITOR_RE.sub(edit, text)
 
-    def arabic_editor(self):
-        if self._editing_text is None:
-            raise AssertionError(
-                'Can\'t access directly to editors, '
-                'You must set editors attr then call `.run()`.'
-            )
 
-        editing_text = self._editing_text
+def edit_quote_marks(text):
+    """
+    Replace '"' with '«' and '»' alternately.
+    """
+    parts = text.split('"')
+    quote_marks = cycle(['«', '»'])
+    return parts[0] + ''.join(next(quote_marks) + part for part in parts[1:])
 
-        # Replace 'ي' with 'ی'
-        while 'ي' in editing_text:
-            editing_text = editing_text.replace('ي', 'ی')
 
-        # Replace 'ك' with 'ک'
-        while 'ك' in editing_text:
-            editing_text = editing_text.replace('ك', 'ک')
+def compile_editors(editors):
+    """
+    Compile editor names into a list of `text -> text` steps.
 
-        self._editing_text = editing_text
+    Consecutive character editors are merged into one `str.translate` call
+    since they never touch each other's characters, but `space` keeps its
+    position because it depends on the marks the others produce.
+    """
+    steps = []
 
-    def number_editor(self):
-        if self._editing_text is None:
-            raise AssertionError(
-                'Can\'t access directly to editors, '
-                'You must set editors attr then call `.run()`.'
-            )
+    for is_space, names in groupby(editors, key=lambda name: name == 'space'):
+        names = list(names)
 
-        persian_nums = ('۰', '۱', '۲', '۳', '۴', '۵', '۶', '۷', '۸', '۹')
-        editing_text = ''
+        if is_space:
+            steps.extend(edit_spaces for _ in names)
+            continue
 
-        for char in self._editing_text:
-            if re.search(r'\d', char):
-                editing_text += persian_nums[int(char)]
-            else:
-                editing_text += char
+        table = {}
+        if 'arabic' in names:
+            table.update(ARABIC_TABLE)
+        if 'number' in names:
+            table.update(get_number_table())
+        if 'punctuation_marks' in names:
+            table.update(PUNCTUATION_MARKS_TABLE)
 
-        self._editing_text = editing_text
+        if table:
+            steps.append(methodcaller('translate', table))
+        if 'punctuation_marks' in names:
+            steps.append(edit_quote_marks)
 
-    def punctuation_marks_editor(self):
+    return steps
+
+
+class CompiledEditors(object):
+    """
+    An immutable pipeline of editors with a pure `run(text)`.
+
+    It keeps no state between runs, so one instance can be shared by every
+    thread. Use `get_editors()` to reuse the compiled pipelines.
+    """
+    __slots__ = ('editors', 'strip', 'escape_return', '_steps')
+
+    def __setattr__(self, key, value):
+        raise AttributeError(
+            "%s is an immutable attribute." % key
+        )
+
+    def __init__(self, editors, strip=True, escape_return=True):
+        for editor_name in editors:
+            if editor_name not in EDITORS:
+                raise TypeError(
+                    "The `%s` editor doesn't exist in editors list" % editor_name
+                )
+
+        super().__setattr__('editors', tuple(editors))
+        super().__setattr__('strip', strip)
+        super().__setattr__('escape_return', escape_return)
+        super().__setattr__('_steps', tuple(compile_editors(editors)))
+
+    def run(self, text):
+        assert text is not None, (
+            '`original_text` can\'t be a NoneType object.'
+        )
+
+        text = edit_general(text, self.strip, self.escape_return)
+
+        for step in self._steps:
+            text = step(text)
+
+        return text
+
+
+@lru_cache(maxsize=None)
+def _get_editors(editors, strip, escape_return):
+    return CompiledEditors(editors, strip, escape_return)
+
+
+def get_editors(editors, strip=True, escape_return=True):
+    """
+    Return the shared `CompiledEditors` for the given editors and options.
+    """
+    if not isinstance(editors, (list, tuple)):
+        raise TypeError(
+            "The `editors` option must be a list or tuple. "
+            "Got %s." % type(editors).__name__
+        )
+
+    return _get_editors(tuple(editors), strip, escape_return)
+
+
+def _run_editors(editors, strip, escape_return, text):
+    return get_editors(editors, strip, escape_return).run(text)
+
+
+def normalize_many(texts, editors=EDITORS, strip=True, escape_return=True,
+                   pool=None):
+    """
+    Return the list of edited texts in the order of the given texts.
+
+    If a `multiprocessing` pool is given, texts are edited by its workers.
+    """
+    editors = tuple(editors)
+    if pool is None:
+        return list(map(get_editors(editors, strip, escape_return).run,
+                        texts))
+
+    run = partial(_run_editors, editors, strip, escape_return)
+    return pool.map(run, texts, chunksize=256)
+
+
+class PersianEditors(object):
+    _persian_punctuation_marks = ['!', '؟', '،', '»', ':', '؛', '.']
+    original_text = None
+    strip = True
+    escape_return = True
+
+    def __setattr__(self, key, value):
+        if key in ['_persian_punctuation_marks']:
+            raise AttributeError(
+                "%s is an immutable attribute." % key
+            )
+        else:
+            super().__setattr__(key, value)
+
+    def __init__(self, editors):
+        self._editing_text = None
+        self._edited_text = None
+        self._editors = None
+        self.set_editors(editors)
+
+    def _check_editing_text(self):
         if self._editing_text is None:
             raise AssertionError(
                 'Can\'t access directly to editors, '
                 'You must set editors attr then call `.run()`.'
             )
 
-        editing_text = self._editing_text
-
-        # Replace '?' with '‌‌‌‌‌‌‌‌؟'
-        while '?' in editing_text:
-            editing_text = editing_text.replace('?', '؟')
-
-        # Replace ',' with '،'
-        while ',' in editing_text:
-            editing_text = editing_text.replace(',', '،')
-
-        # Replace ';' with '؛'
-        while ';' in editing_text:
-            editing_text = editing_text.replace(';', '؛')
+    def _general_editor(self):
+        self._check_editing_text()
+        self._editing_text = edit_general(self._editing_text, self.strip,
+                                          self.escape_return)
 
-        # Replace '"' with '‌«»'
-        quote_mark = '«'
+    def space_editor(self):
+        self._check_editing_text()
+        self._editing_text = edit_spaces(self._editing_text)
 
-        while '"' in editing_text:
-            editing_text = editing_text.replace('"', quote_mark, 1)
+    def arabic_editor(self):
+        self._check_editing_text()
+        self._editing_text = self._editing_text.translate(ARABIC_TABLE)
 
-            if quote_mark == '»':
-                quote_mark = '«'
-            else:
-                quote_mark = '»'
+    def number_editor(self):
+        self._check_editing_text()
+        self._editing_text = self._editing_text.translate(get_number_table())
 
-        self._editing_text = editing_text
+    def punctuation_marks_editor(self):
+        self._check_editing_text()
+        editing_text = self._editing_text.translate(PUNCTUATION_MARKS_TABLE)
+        self._editing_text = edit_quote_marks(editing_text)
 
     def run(self, original_text):
         self._set_original_text(original_text)
-        self._editing_text = self.original_text
-        self._general_editor()
-
-        for editor_name in self._editors:
-            editor_method = getattr(self, f'{editor_name}_editor')
-            editor_method()
-
-        self._edited_text = self._editing_text
-        self._editing_text = None
+        editors = get_editors(self._editors, self.strip, self.escape_return)
+        self._edited_text = editors.run(self.original_text)
 
         return self.edited_text
 
@@ -1,23 +1,46 @@
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
+from django.utils import translation
+from django.utils.functional import cached_property
 
 from .models import Page
 
+SITEMAP_INDEX_FILENAME = 'sitemap.xml'
+
 
 class PageSitemap(Sitemap):
     priority = 0.9
     changefreq = 'daily'
     protocol = 'https'
+    limit = getattr(settings, 'SITEMAP_LIMIT', 10000)
+
+    def __init__(self, language):
+        self.language = language
+
+    @cached_property
+    def location_format(self):
+        language = self.language
+        if settings.LANGUAGE_CODE.split('-')[0] == language:
+            # Keep the default language URLs unprefixed.
+            language = settings.LANGUAGE_CODE
+
+        # Reverse once and fill in the pid of each page.
+        with translation.override(language):
+            location = reverse('web:page-detail', args=['PID'])
+        return location.replace('PID', '{}')
 
     def items(self):
-        return Page.objects.filter(is_active=True)
+        return Page.objects.filter(
+            is_active=True, language=self.language).order_by('pk').only(
+            'pid', 'updated_on')
 
     @staticmethod
     def lastmod(obj):
         return obj.updated_on
 
     def location(self, obj):
-        return f'/{obj.pid}/'
+        return self.location_format.format(obj.pid)
 
 
 class StaticViewSitemap(Sitemap):
@@ -30,3 +53,26 @@ class StaticViewSitemap(Sitemap):
 
     def location(self, item):
         return reverse(item)
+
+
+def get_sitemaps():
+    """
+    Return the sitemap sections: one for the pages of each language and one
+    for the static views.
+    """
+    sitemaps = {f'pages-{code}': PageSitemap(code)
+                for code, name in settings.LANGUAGES}
+    sitemaps['statics'] = StaticViewSitemap()
+    return sitemaps
+
+
+def get_sitemaps_url(domain):
+    """
+    Return the absolute URL the sitemaps written by `generate_sitemaps` are
+    served from.
+    """
+    sitemaps_url = getattr(settings, 'SITEMAP_URL',
+                           f'{settings.STATIC_URL}sitemaps/')
+    if '://' not in sitemaps_url:
+        sitemaps_url = f'https://{domain}{sitemaps_url}'
+    return sitemaps_url
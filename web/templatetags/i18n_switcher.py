@@ -1,7 +1,10 @@
+from functools import lru_cache
+
 from django import template
 from django.template.defaultfilters import stringfilter
+from django.utils.html import format_html_join
 
-from web.helpers import switch_lang_code
+from web.helpers import get_alternate_paths, switch_lang_code
 
 register = template.Library()
 
@@ -21,3 +24,43 @@ def switch_i18n(request, language):
     Takes in a request object and gets the path from it.
     """
     return switch_lang_code(request.get_full_path(), language)
+
+
+@register.simple_tag(takes_context=True)
+def alternate_urls(context):
+    """
+    Return `(language, path)` of the current path in every language.
+    """
+    request = context.get('request')
+    return get_alternate_paths(request.get_full_path()) if request else ()
+
+
+def format_hreflang_links(base_url, alternate_paths):
+    return format_html_join(
+        '', '<link rel=alternate hreflang={} href="{}{}"/>',
+        ((code, base_url, alternate_path)
+         for code, alternate_path in alternate_paths))
+
+
+@lru_cache(maxsize=1024)
+def render_hreflang_links(base_url, path):
+    # The default language is served without a prefix.
+    return format_hreflang_links(
+        base_url, get_alternate_paths(path, prefix_default_language=False))
+
+
+@register.simple_tag(takes_context=True)
+def hreflang_links(context):
+    """
+    Render the `<link rel=alternate hreflang=...>` of the current page in
+    every language, or of the `alternate_paths` the view found for it.
+    """
+    request = context.get('request')
+    if request is None:  # e.g. the server error page
+        return ''
+
+    base_url = context.get('BASE_URL', '')
+    alternate_paths = context.get('alternate_paths')
+    if alternate_paths is not None:
+        return format_hreflang_links(base_url, alternate_paths)
+    return render_hreflang_links(base_url, request.get_full_path())
@@ -1,9 +1,11 @@
 from urllib.parse import urlencode
 
 from django import template
+from django.core.files.storage import default_storage
 from django.template.defaultfilters import stringfilter
 
-from web.persian_editors import PersianEditors
+from web.persian_editors import get_editors
+from web.thumbnails import get_thumbnail_size
 
 register = template.Library()
 
@@ -11,9 +13,7 @@ register = template.Library()
 @register.filter(name='to_persian')
 @stringfilter
 def convert_digits_to_persian(value):
-    editor = PersianEditors(['number'])
-    editor.escape_return = False
-    return editor.run(value)
+    return get_editors(['number'], escape_return=False).run(value)
 
 
 @register.simple_tag(takes_context=True)
@@ -21,3 +21,26 @@ def url_replace(context, **kwargs):
     query = context['request'].GET.dict()
     query.update(kwargs)
     return urlencode(query)
+
+
+@register.simple_tag
+def page_thumbnail(page, geometry):
+    """
+    Return the URLs and size of the pre-generated thumbnail of `page` in
+    `geometry`. Until `generate_thumbnails` has made it, fall back to the
+    original image shown at the size of the thumbnail, or `None` if there
+    is no readable image.
+    """
+    thumbnail = page.thumbnails.get('sizes', {}).get(geometry)
+    if thumbnail is not None:
+        return {'url': default_storage.url(thumbnail['name']),
+                'webp_url': default_storage.url(thumbnail['webp_name']),
+                'width': thumbnail['width'], 'height': thumbnail['height']}
+
+    if not page.image or not page.image_width or not page.image_height:
+        return None
+
+    width, height = get_thumbnail_size(
+        (page.image_width, page.image_height), geometry)
+    return {'url': page.image.url, 'webp_url': None, 'width': width,
+            'height': height}
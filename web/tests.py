@@ -1,9 +1,34 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone, translation
+from PIL import Image
 
+from .context_processors import clear_site_context_cache, site_settings
 from .forms import SearchForm
-from .models import Report, Page, generate_pid
+from .helpers import get_active_lang, request_lang, switch_lang_code
+from .ids import pid_allocator
+from .instrumentation import RequestMetrics, clear_samples
+from .models import Report, Page, Tag, Email, Group, User, \
+    generate_gid, generate_pid
+from .persian_editors import PersianEditors, get_editors, normalize_many
 from .templatetags.web_extras import convert_digits_to_persian as to_persian
+from .templatetags.web_extras import page_thumbnail
+from .thumbnails import get_thumbnail_geometries
 
 
 def create_test_page(n):
@@ -87,171 +112,1033 @@ class PageListViewTests(TestCase):
         self.assertQuerysetEqual(response.context['object_list'],
                                  ['<Page: Majid>'])
 
-    # def test_search_with_result_with_partial_query_string(self):
-    #     """
-    #     If result found, show the result
-    #     else an appropriate message is displayed.
-    #     """
-    #     create_test_page(4)
-    #     create_test_active_page(4)
-    #
-    #     response = self.client.get(reverse('web:page-list'),
-    #     data={'q': 'py'})
-    #
-    #     self.assertEqual(response.status_code, 200)
-    #     self.assertEqual(response.context['page_obj'].paginator.count, 1)
-    #     self.assertQuerysetEqual(response.context['object_list'],
-    #     ['<Page: Pycharm>'])
-
-    # def test_search_with_no_include_inactive_pages(self):
-    #     """
-    #     If result found, show the result
-    #     else an appropriate message is displayed.
-    #     """
-    #     create_test_page(4)
-    #     create_test_active_page(4)
-    #
-    #     response = self.client.get(reverse('web:page-list'), data={'q': 'm'})
-    #
-    #     self.assertEqual(response.status_code, 200)
-    #     self.assertEqual(response.context['page_obj'].paginator.count, 3)
-    #     self.assertQuerysetEqual(response.context['object_list'],
-    #     ['<Page: Majid>', '<Page: Pycharm>', '<Page: Mari>'])
+    def test_search_with_result_with_partial_query_string(self):
+        """
+        If result found, show the result
+        else an appropriate message is displayed.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        response = self.client.get(reverse('web:page-list'),
+                                   data={'q': 'py'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertQuerysetEqual(response.context['object_list'],
+                                 ['<Page: Pycharm>'])
+
+    def test_search_with_no_include_inactive_pages(self):
+        """
+        If result found, show the result
+        else an appropriate message is displayed.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        response = self.client.get(reverse('web:page-list'), data={'q': 'm'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+        self.assertQuerysetEqual(response.context['object_list'],
+                                 ['<Page: Majid>', '<Page: Pycharm>',
+                                  '<Page: Mari>'], ordered=False)
+
+    def test_search_with_typo_in_query_string(self):
+        """
+        Show the pages with a similar title.
+        """
+        create_test_active_page(4)
+
+        response = self.client.get(reverse('web:page-list'),
+                                   data={'q': 'pychram'})
+
+        self.assertQuerysetEqual(response.context['object_list'],
+                                 ['<Page: Pycharm>'])
+
+    def test_search_rank_full_text_first(self):
+        """
+        Show the full-text matches before the partial ones.
+        """
+        Page.objects.create(title='Pythonista', content='', is_active=True)
+        Page.objects.create(title='Django', content='python',
+                            is_active=True)
+
+        self.assertQuerysetEqual(Page.objects.search('python'),
+                                 ['<Page: Django>', '<Page: Pythonista>'])
+
+
+class PageListViewQueriesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def create_tagged_pages(self, n):
+        tags = [Tag.objects.create(name=f'tag{i}', keyword=f'tag{i}',
+                                   is_active=i != 1) for i in range(5)]
+        for i in range(n):
+            page = Page.objects.create(title='Linux', content='',
+                                       is_active=True)
+            page.tags.set(tags)
+
+    def test_constant_queries_with_few_pages(self):
+        """
+        Rank, fetch the slice and prefetch the tags in three queries.
+        """
+        self.create_tagged_pages(2)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('web:page-list'),
+                                       data={'q': 'linux'})
+
+        self.assertEqual(len(response.context['object_list']), 2)
+
+    def test_constant_queries_with_full_page(self):
+        """
+        Use the same number of queries for a full page of results and show
+        only three active tags of each page.
+        """
+        self.create_tagged_pages(10)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('web:page-list'),
+                                       data={'q': 'linux'})
+
+        self.assertEqual(len(response.context['object_list']), 8)
+        self.assertNotContains(response, '#tag1')
+        self.assertContains(response, '#tag3', count=8)
+        self.assertNotContains(response, '#tag4')
+
+
+class PageSearchVectorTests(TestCase):
+
+    def test_search_vector_on_save(self):
+        """
+        Find the page by its new title after saving.
+        """
+        create_test_active_page(1)
+
+        page = Page.objects.get(title='Mari')
+        page.title = 'Ubuntu'
+        page.save()
+
+        self.assertQuerysetEqual(Page.objects.search('ubuntu'),
+                                 ['<Page: Ubuntu>'])
+        self.assertQuerysetEqual(Page.objects.search('mari'), [])
+
+    def test_search_vector_kept_on_other_change(self):
+        """
+        Skip the search vector update if no indexed field changed.
+        """
+        create_test_active_page(1)
+
+        page = Page.objects.get(title='Mari')
+        page.is_active = False
+        with CaptureQueriesContext(connection) as queries:
+            page.save()
+
+        updates = [query for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+    def test_search_without_search_vector(self):
+        """
+        Rank the pages without a search vector after the full-text matches.
+        """
+        Page.objects.create(title='Linux', content='', is_active=True)
+        Page.objects.create(title='Linux Mint', content='', is_active=True)
+        Page.objects.filter(title='Linux Mint').update(search_vector=None)
+
+        self.assertQuerysetEqual(Page.objects.search('linux'),
+                                 ['<Page: Linux>', '<Page: Linux Mint>'])
+
+    def test_search_vector_on_tags_change(self):
+        """
+        Find the page by its tag name only while the tag is related.
+        """
+        create_test_active_page(2)
+
+        page = Page.objects.get(title='Mari')
+        tag = Tag.objects.create(name='Gnome', keyword='gnome')
+        page.tags.add(tag)
+
+        self.assertQuerysetEqual(Page.objects.search('gnome'),
+                                 ['<Page: Mari>'])
+
+        tag.pages.clear()
+
+        self.assertQuerysetEqual(Page.objects.search('gnome'), [])
+
+    def test_search_vector_on_tag_rename(self):
+        """
+        Find the page by the new name of its tag.
+        """
+        create_test_active_page(1)
+
+        page = Page.objects.get(title='Mari')
+        tag = Tag.objects.create(name='Gnome', keyword='gnome')
+        page.tags.add(tag)
+        tag.name = 'Plasma'
+        tag.save()
+
+        self.assertQuerysetEqual(Page.objects.search('plasma'),
+                                 ['<Page: Mari>'])
+
+    def test_update_search_vector_command(self):
+        """
+        Backfill the search vector of pages without it.
+        """
+        create_test_active_page(4)
+        Page.objects.update(search_vector=None)
+
+        call_command('update_search_vector', batch_size=3, stdout=StringIO())
+
+        self.assertFalse(
+            Page.objects.filter(search_vector__isnull=True).exists())
+        self.assertQuerysetEqual(Page.objects.search('peon'),
+                                 ['<Page: Peon>'])
+
+
+class SearchCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_search_skip_ranking(self):
+        """
+        Fetch only the pages of the slice and their tags when the result is
+        cached.
+        """
+        create_test_active_page(4)
+
+        with self.assertNumQueries(3):
+            result = Page.objects.cached_search('Majid')
+            self.assertEqual([page.title for page in result[:8]], ['Majid'])
+
+        with self.assertNumQueries(2):
+            result = Page.objects.cached_search(' majid ')
+            self.assertEqual(result.count(), 1)
+            self.assertEqual([page.title for page in result[:8]], ['Majid'])
+
+    def test_cached_search_invalidation(self):
+        """
+        Drop the cached result when a page is changed.
+        """
+        create_test_active_page(4)
+
+        self.assertEqual(Page.objects.cached_search('Majid').count(), 1)
+
+        Page.objects.create(title='Majid', content='', is_active=True)
+
+        self.assertEqual(Page.objects.cached_search('Majid').count(), 2)
+
+
+class PageDetailViewTests(TestCase):
+
+    def test_page_with_id_exist(self):
+        """
+        If page found, show the content.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        page = self.client.get(reverse('web:page-list'),
+                               data={'q': 'pycharm'}).context['object_list']
+        response = self.client.get(
+            reverse('web:page-detail', args=(page[0].pid,)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Pycharm')
+
+    def test_page_with_id_exist_but_not_active(self):
+        """
+        Only show the active page.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        page = Page.objects.get(title='Python')
+        pid = page.pid
+
+        response = self.client.get(reverse('web:page-detail', args=(pid,)))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_with_id_not_exist(self):
+        """
+        Return a 404 not found.
+        """
+        response = self.client.get(reverse('web:page-detail', args=(1,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class PageDetailViewCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_test_active_page(1)
+        self.page = Page.objects.get(title='Mari')
+        self.tag = Tag.objects.create(name='Gnome', keyword='gnome')
+        self.page.tags.add(self.tag)
+        self.url = reverse('web:page-detail', args=(self.page.pid,))
+
+    def test_validators(self):
+        """
+        Return ETag and Last-Modified headers and 304 for fresh copies.
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        response = self.client.get(self.url,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_skip_rendering(self):
+        """
+        Only fetch the page to answer a conditional request.
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cached_fragments(self):
+        """
+        Skip the tags queries once the detail fragments are cached.
+        """
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertContains(response, '#gnome')
+
+    def test_tags_change_purge_fragments(self):
+        """
+        Show the new tags and change the ETag after the tags change.
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        self.page.tags.add(Tag.objects.create(name='Plasma', keyword='kde'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, '#kde')
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_test_active_page(4)
+
+    def test_index_not_modified(self):
+        """
+        Answer from the cached pool without queries or rendering.
+        """
+        response = self.client.get(reverse('web:index'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('web:index'),
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, 'web/pages/index.html')
+
+    def test_index_modified_after_page_change(self):
+        """
+        Change the validators with a new sampling epoch.
+        """
+        response = self.client.get(reverse('web:index'))
+        Page.objects.create(title='Ubuntu', content='', is_active=True)
+
+        response = self.client.get(reverse('web:index'),
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_not_modified(self):
+        """
+        Answer from the cached result without queries or rendering.
+        """
+        url = reverse('web:page-list')
+        response = self.client.get(url, data={'q': 'majid'})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, data={'q': 'majid'},
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, 'web/pages/page_list.html')
+
+    def test_search_etag_vary_on_query(self):
+        """
+        Return different ETags for different queries.
+        """
+        url = reverse('web:page-list')
+        etag = self.client.get(url, data={'q': 'majid'})['ETag']
+
+        response = self.client.get(url, data={'q': 'mari'},
+                                   HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_search_modified_after_page_change(self):
+        """
+        Change the validators when a matched page is changed.
+        """
+        url = reverse('web:page-list')
+        etag = self.client.get(url, data={'q': 'majid'})['ETag']
+
+        page = Page.objects.get(title='Majid')
+        page.content = 'Changed'
+        page.save()
+        response = self.client.get(url, data={'q': 'majid'},
+                                   HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_without_result(self):
+        """
+        Render the page without validators.
+        """
+        response = self.client.get(reverse('web:page-list'),
+                                   data={'q': 'ubuntu'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class SearchFormTest(TestCase):
+
+    def test_without_data(self):
+        """
+        Return empty dict.
+        """
+        form = SearchForm()
+
+        self.assertEqual(form.data, {})
+        self.assertFalse(form.is_valid())
+
+    def test_with_empty_string(self):
+        """
+        Return q with empty string.
+        """
+        form = SearchForm(data={'q': ''})
+
+        self.assertEqual(form.data, {'q': ''})
+        self.assertFalse(form.is_valid())
+
+    def test_with_string(self):
+        """
+        Return q with it's data.
+        """
+        form = SearchForm(data={'q': 'django'})
+
+        self.assertEqual(form.data, {'q': 'django'})
+        self.assertTrue(form.is_valid())
+
+
+class PageModelTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_random_pages_with_no_page(self):
+        """
+        Return empty queryset.
+        """
+        random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 0)
+
+    def test_random_pages_with_less_than_three_page(self):
+        """
+        Return a queryset with 2 objects.
+        """
+        create_test_page(4)
+        create_test_active_page(2)
+
+        random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 2)
+
+    def test_random_pages_with_exact_three_page(self):
+        """
+        Return a queryset with 3 objects.
+        """
+        create_test_page(4)
+        create_test_active_page(3)
+
+        random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 3)
+
+    def test_random_pages_with_more_than_three_page(self):
+        """
+        Return a queryset with 3 objects.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 3)
+
+    def test_random_pages_uniqueness(self):
+        """
+        Return a queryset with 3 unique objects.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+
+        random_page = Page.objects.get_random_pages()
+
+        self.assertNotEqual(random_page[0].id, random_page[1].id)
+        self.assertNotEqual(random_page[1].id, random_page[2].id)
+        self.assertNotEqual(random_page[0].id, random_page[2].id)
+        self.assertIs(len(random_page), 3)
+
+    def test_random_pages_with_custom_count(self):
+        """
+        Return a list with the requested number of objects.
+        """
+        create_test_active_page(4)
+
+        random_page = Page.objects.get_random_pages(count=2)
+
+        self.assertIs(len(random_page), 2)
+
+    def test_random_pages_pool_is_cached(self):
+        """
+        Fetch only the sampled pages once the pool is cached.
+        """
+        create_test_active_page(4)
+        Page.objects.get_random_pages()
+
+        with self.assertNumQueries(1):
+            random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 3)
+
+    def test_random_pages_pool_invalidation(self):
+        """
+        Include a new active page after the pool is cached.
+        """
+        create_test_active_page(2)
+        Page.objects.get_random_pages()
+        Page.objects.create(title='Ubuntu', content='', is_active=True)
+
+        random_page = Page.objects.get_random_pages()
+
+        self.assertIs(len(random_page), 3)
+
+    @override_settings(RANDOM_PAGES_POOL_SIZE=2)
+    def test_random_pages_pool_is_sampled(self):
+        """
+        Keep a sample of the active pages when there are more than the
+        pool size.
+        """
+        create_test_page(4)
+        create_test_active_page(4)
+        active_pages_pk = set(Page.objects.all_active().values_list(
+            'pk', flat=True))
+
+        epoch, pages_pk = Page.objects.get_random_pages_pool()
+
+        self.assertIn(len(pages_pk), [1, 2])
+        self.assertEqual(len(set(pages_pk)), len(pages_pk))
+        self.assertLessEqual(set(pages_pk), active_pages_pk)
+
+    def test_random_pages_pool_kept_on_edit(self):
+        """
+        Keep the cached pool when a page is edited but stays active in its
+        language, and refresh it when the page is deactivated.
+        """
+        create_test_active_page(4)
+        epoch, pages_pk = Page.objects.get_random_pages_pool()
+        page = Page.objects.get(title='Mari')
+
+        page.title = 'Marie'
+        page.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(Page.objects.get_random_pages_pool(),
+                             (epoch, pages_pk))
+
+        page.is_active = False
+        page.save()
+
+        epoch, pages_pk = Page.objects.get_random_pages_pool()
+        self.assertNotIn(page.pk, pages_pk)
+
+    def test_a_new_pid(self):
+        """
+        Generate a new pid with 13 characters length.
+        """
+        new_pid = generate_pid()
+
+        self.assertEqual(len(new_pid), 16)
+
+
+class IdAllocatorTests(TestCase):
+
+    def test_allocate(self):
+        """
+        Allocate unique, time ordered ids of the same shape.
+        """
+        pids = pid_allocator.allocate(1000) + pid_allocator.allocate(10)
+
+        self.assertEqual(len(set(pids)), 1010)
+        self.assertEqual(pids, sorted(pids))
+        for pid in pids:
+            self.assertRegex(pid, r'^lmp_[0-9A-Za-z]{12}$')
+
+    @override_settings(GID_PREFIX='test')
+    def test_prefix_setting(self):
+        """
+        Read the prefix from the settings.
+        """
+        self.assertTrue(generate_gid().startswith('test_'))
+
+    def test_create_without_lookup(self):
+        """
+        Create a page with no query for its pid.
+        """
+        with self.assertNumQueries(0):
+            generate_pid()
+
+    def test_retry_taken_pid(self):
+        """
+        Save a new page with another pid if its allocated pid is already
+        taken.
+        """
+        page = Page.objects.create(title='Linux', content='')
+        new_page = Page(title='Python', content='')
+        taken_pid = new_page.pid
+        Page.objects.filter(pk=page.pk).update(pid=taken_pid)
+
+        new_page.save()
+
+        self.assertNotEqual(new_page.pid, taken_pid)
+        self.assertEqual(Page.objects.count(), 2)
+
+    def test_retry_taken_gid(self):
+        """
+        Never overwrite a group with the same allocated gid.
+        """
+        group = Group.objects.create()
+        new_group = Group()
+        taken_gid = new_group.gid
+        Group.objects.filter(pk=group.pk).update(gid=taken_gid)
+
+        new_group.save()
+
+        self.assertNotEqual(new_group.gid, taken_gid)
+        self.assertEqual(Group.objects.count(), 2)
+
+    def test_explicit_taken_pid(self):
+        """
+        Raise error on saving a page with the pid of another page.
+        """
+        page = Page.objects.create(title='Linux', content='')
+
+        with self.assertRaises(IntegrityError):
+            Page.objects.create(title='Python', content='', pid=page.pid)
+
+        self.assertEqual(Page.objects.count(), 1)
+
+    def test_explicit_taken_gid(self):
+        """
+        Raise error on saving a group with the gid of another group.
+        """
+        group = Group.objects.create()
+
+        with self.assertRaises(IntegrityError):
+            Group.objects.create(gid=group.gid)
+
+        self.assertEqual(Group.objects.count(), 1)
+
+
+class AdminChangelistQueriesTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_superuser('admin@example.com', 'secret')
+        self.client.force_login(user)
+
+    def create_pages(self, n):
+        tag = Tag.objects.create(name=f'tag{Tag.objects.count()}',
+                                 keyword='tag')
+        for i in range(n):
+            group = Group.objects.create()
+            page = Page.objects.create(title=f'Linux {i}', content='',
+                                       group=group)
+            page.tags.add(tag)
+            Report.objects.create(page=page, body='Gnome',
+                                  reporter='go.mezzo@icloud.com')
+            Tag.objects.create(name=f'unused{Tag.objects.count()}',
+                               keyword='unused')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.create_pages(2)
+        self.client.get(url)  # Cache the current site
+        queries_count = self.count_queries(url)
+        self.create_pages(10)
+        self.assertEqual(self.count_queries(url), queries_count)
+
+    def test_group_changelist(self):
+        """
+        Show the title and usage of groups in a constant number of queries.
+        """
+        self.assertConstantQueries(reverse('admin:web_group_changelist'))
+
+        response = self.client.get(reverse('admin:web_group_changelist'))
+        self.assertContains(response, 'Linux 9')
+
+    def test_page_changelist(self):
+        """
+        Show pages in a constant number of queries.
+        """
+        self.assertConstantQueries(reverse('admin:web_page_changelist'))
+
+    def test_report_changelist(self):
+        """
+        Show the reports with their page in a constant number of queries.
+        """
+        self.assertConstantQueries(reverse('admin:web_report_changelist'))
+
+    def test_tag_changelist(self):
+        """
+        Show the usage of tags in a constant number of queries.
+        """
+        self.assertConstantQueries(reverse('admin:web_tag_changelist'))
+
+    def test_group_changelist_ordering(self):
+        """
+        Sort groups by their title and usage.
+        """
+        self.create_pages(2)
+        Group.objects.create()
+        url = reverse('admin:web_group_changelist')
+
+        response = self.client.get(url, data={'o': '1'})
+        self.assertEqual([str(group) for group in response.context[
+            'cl'].result_list][:2], ['Linux 0', 'Linux 1'])
+
+        response = self.client.get(url, data={'o': '4'})
+        self.assertFalse(response.context['cl'].result_list[0].titles)
+
+
+class GroupAdminSearchTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_superuser('admin@example.com', 'secret')
+        self.client.force_login(user)
+        self.group = Group.objects.create()
+        self.page = Page.objects.create(title='Linux', content='',
+                                        group=self.group, language='en')
+        Page.objects.create(title='لینوکس', content='', group=self.group,
+                            language='fa')
+        Page.objects.create(title='Python', content='',
+                            group=Group.objects.create(), language='en')
+
+    def search(self, term):
+        response = self.client.get(reverse('admin:web_group_changelist'),
+                                   data={'q': term})
+        return list(response.context['cl'].result_list)
+
+    def test_search_titles(self):
+        """
+        Find groups by part of their title in any language.
+        """
+        self.assertEqual(self.search('inu'), [self.group])
+        self.assertEqual(self.search('لینو'), [self.group])
+
+    def test_search_ids(self):
+        """
+        Find groups by their gid or the pid of one of their pages.
+        """
+        self.assertEqual(self.search(self.group.gid), [self.group])
+        self.assertEqual(self.search(self.page.pid), [self.group])
+        self.assertEqual(self.search(self.page.pid[:-1]), [])
+
 
+class SitemapTests(TestCase):
 
-class PageDetailViewTests(TestCase):
+    def setUp(self):
+        Page.objects.create(title='Linux', content='', is_active=True)
+        Page.objects.create(title='لینوکس', content='', is_active=True,
+                            language='fa')
+        Page.objects.create(title='Python', content='')
 
-    def test_page_with_id_exist(self):
+    def test_index(self):
         """
-        If page found, show the content.
+        List a section for the pages of each language.
         """
-        create_test_page(4)
-        create_test_active_page(4)
+        response = self.client.get(reverse('web:sitemap'))
 
-        page = self.client.get(reverse('web:page-list'),
-                               data={'q': 'pycharm'}).context['object_list']
-        response = self.client.get(
-            reverse('web:page-detail', args=(page[0].pid,)))
+        self.assertContains(response, '/sitemap-pages-en.xml')
+        self.assertContains(response, '/sitemap-pages-fa.xml')
+        self.assertContains(response, '/sitemap-statics.xml')
 
-        self.assertEqual(response.status_code, 200)
-        self.assertContains(response, 'Pycharm')
+    def test_language_section(self):
+        """
+        Only list the active pages of the section language.
+        """
+        page = Page.objects.get(language='fa')
+        response = self.client.get(reverse('web:sitemap-section',
+                                           args=['pages-fa']))
 
-    def test_page_with_id_exist_but_not_active(self):
+        self.assertContains(response, f'/fa/{page.pid}/')
+        self.assertContains(response, '<url>', count=1)
+
+    def test_generate_sitemaps(self):
         """
-        Only show the active page.
+        Write the index and the gzipped sections.
         """
-        create_test_page(4)
-        create_test_active_page(4)
+        with tempfile.TemporaryDirectory() as output:
+            out = StringIO()
+            call_command('generate_sitemaps', output=output,
+                         domain='laum.ir', stdout=out)
 
-        page = Page.objects.get(title='Python')
-        pid = page.pid
+            self.assertIn('4 url(s) written to 3 sitemap(s).',
+                          out.getvalue())
+            with open(os.path.join(output, 'sitemap.xml')) as file:
+                self.assertIn('https://laum.ir/static/sitemaps/'
+                              'sitemap-pages-en-1.xml.gz', file.read())
+            with gzip.open(os.path.join(
+                    output, 'sitemap-pages-en-1.xml.gz'), 'rt') as file:
+                self.assertIn(
+                    f'https://laum.ir/{Page.objects.get(title="Linux").pid}/',
+                    file.read())
 
-        response = self.client.get(reverse('web:page-detail', args=(pid,)))
+    def test_robots(self):
+        """
+        Point crawlers to the generated sitemap index.
+        """
+        domain = Site.objects.get_current().domain
+        response = self.client.get(reverse('web:robots'))
 
-        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertContains(response, f'Sitemap: https://{domain}/static/'
+                                      f'sitemaps/sitemap.xml\n')
 
-    def test_page_with_id_not_exist(self):
+
+class SiteSettingsTests(TestCase):
+
+    def setUp(self):
+        clear_site_context_cache()
+
+    def test_memoized_context(self):
         """
-        Return a 404 not found.
+        Build the context once per site and protocol without touching the
+        shared settings.
         """
-        response = self.client.get(reverse('web:page-detail', args=(1,)))
-        self.assertEqual(response.status_code, 404)
+        request = RequestFactory().get('/')
+        site_context = site_settings(request)
 
+        with self.assertNumQueries(0):
+            self.assertIs(site_settings(request), site_context)
+        self.assertEqual(site_context['BASE_URL'], 'http://example.com')
+        self.assertNotIn('BASE_URL', settings.SITE_CONTEXT)
+        with self.assertRaises(TypeError):
+            site_context['SITE_NAME'] = 'Laum'
 
-class SearchFormTest(TestCase):
+        secure_request = RequestFactory().get('/', secure=True)
+        self.assertEqual(site_settings(secure_request)['BASE_URL'],
+                         'https://example.com')
 
-    def test_without_data(self):
+    def test_site_change(self):
         """
-        Return empty dict.
+        Rebuild the context after the site changes.
         """
-        form = SearchForm()
+        request = RequestFactory().get('/')
+        site_settings(request)
+        site = Site.objects.get_current()
+        site.domain = 'laum.ir'
+        site.save()
 
-        self.assertEqual(form.data, {})
-        self.assertFalse(form.is_valid())
+        self.assertEqual(site_settings(request)['BASE_URL'], 'http://laum.ir')
 
-    def test_with_empty_string(self):
+
+class I18nSwitcherTests(TestCase):
+
+    def test_switch_lang_code(self):
         """
-        Return q with empty string.
+        Replace or add the language prefix of the path.
         """
-        form = SearchForm(data={'q': ''})
+        self.assertEqual(switch_lang_code('/fa/search/?q=en', 'en'),
+                         '/en/search/?q=en')
+        self.assertEqual(switch_lang_code('/search/', 'fa'), '/fa/search/')
+        self.assertEqual(switch_lang_code('/fa', 'en'), '/en')
+        self.assertEqual(switch_lang_code('/fake/', 'en'), '/en/fake/')
+        with self.assertRaises(Exception):
+            switch_lang_code('/search/', 'de')
+        with self.assertRaises(Exception):
+            switch_lang_code('search/', 'fa')
 
-        self.assertEqual(form.data, {'q': ''})
-        self.assertFalse(form.is_valid())
+    def test_hreflang_links(self):
+        """
+        Link every language version of the current page.
+        """
+        response = self.client.get(reverse('web:index'))
 
-    def test_with_string(self):
+        self.assertContains(
+            response, '<link rel=alternate hreflang=fa '
+                      'href="http://example.com/fa/"/>')
+        self.assertContains(
+            response, '<link rel=alternate hreflang=en '
+                      'href="http://example.com/"/>')
+
+    def test_page_detail_hreflang_links(self):
         """
-        Return q with it's data.
+        Link the active pages of the same group, as a pid has one language.
         """
-        form = SearchForm(data={'q': 'django'})
+        group = Group.objects.create()
+        page = Page.objects.create(title='Linux', content='', group=group,
+                                   is_active=True)
+        fa_page = Page.objects.create(title='لینوکس', content='',
+                                      group=group, language='fa',
+                                      is_active=True)
+        alone = Page.objects.create(title='Python', content='',
+                                    is_active=True)
 
-        self.assertEqual(form.data, {'q': 'django'})
-        self.assertTrue(form.is_valid())
+        response = self.client.get(page.get_absolute_url())
+        self.assertContains(
+            response, f'<link rel=alternate hreflang=en '
+                      f'href="http://example.com/{page.pid}/"/>')
+        self.assertContains(
+            response, f'<link rel=alternate hreflang=fa '
+                      f'href="http://example.com/fa/{fa_page.pid}/"/>')
+        self.assertNotContains(response, f'/fa/{page.pid}/')
 
+        fa_page.is_active = False
+        fa_page.save()
+        response = self.client.get(alone.get_absolute_url())
+        self.assertContains(response, 'hreflang=', count=1)
+        response = self.client.get(page.get_absolute_url())
+        self.assertContains(response, 'hreflang=', count=1)
 
-class PageModelTests(TestCase):
 
-    def test_random_pages_with_no_page(self):
+class ActiveLanguageTests(TestCase):
+
+    def test_request_language(self):
         """
-        Return empty queryset.
+        Resolve the normalized language once for the whole request.
         """
-        random_page = Page.objects.get_random_pages()
+        with translation.override('en'):
+            response = self.client.get('/fa/')
 
-        self.assertIs(len(random_page), 0)
+        self.assertEqual(response.wsgi_request.active_language, 'fa')
+        self.assertEqual(get_active_lang(), 'en')
 
-    def test_random_pages_with_less_than_three_page(self):
+    def test_language_override_in_request(self):
         """
-        Return a queryset with 2 objects.
+        Follow a language activated after the request language is stored.
         """
-        create_test_page(4)
-        create_test_active_page(2)
+        with translation.override('fa-ir'):
+            token = request_lang.set(('fa-ir', 'fa'))
+            try:
+                self.assertEqual(get_active_lang(), 'fa')
+                with translation.override('en'):
+                    self.assertEqual(get_active_lang(), 'en')
+                    page = Page.objects.create(title='Linux', content='')
+            finally:
+                request_lang.reset(token)
 
-        random_page = Page.objects.get_random_pages()
-
-        self.assertIs(len(random_page), 2)
+        self.assertEqual(page.language, 'en')
 
-    def test_random_pages_with_exact_three_page(self):
+    def test_localized_manager(self):
         """
-        Return a queryset with 3 objects.
+        Scope the localized managers to the active language.
         """
-        create_test_page(4)
-        create_test_active_page(3)
+        Page.objects.create(title='Linux', content='')
+        Page.objects.create(title='لینوکس', content='', language='fa')
 
-        random_page = Page.objects.get_random_pages()
+        self.assertQuerysetEqual(Page.localized.all(), ['<Page: Linux>'])
+        with translation.override('fa'):
+            self.assertQuerysetEqual(Page.localized.all(),
+                                     ['<Page: لینوکس>'])
+        self.assertEqual(Page.objects.count(), 2)
 
-        self.assertIs(len(random_page), 3)
 
-    def test_random_pages_with_more_than_three_page(self):
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        clear_samples()
+        self.page = Page.objects.create(title='Linux', content='',
+                                        is_active=True)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_server_timing(self):
         """
-        Return a queryset with 3 objects.
+        Report the queries, template time and cache use of the request.
         """
-        create_test_page(4)
-        create_test_active_page(4)
+        response = self.client.get(self.page.get_absolute_url())
 
-        random_page = Page.objects.get_random_pages()
+        self.assertRegex(response['Server-Timing'],
+                         r'db;desc="[1-9]\d* queries";dur=[\d.]+, '
+                         r'tpl;desc="Template";dur=[\d.]+, '
+                         r'cache;desc="\d+ hits, [1-9]\d* misses", '
+                         r'total;desc="Total";dur=[\d.]+')
 
-        self.assertIs(len(random_page), 3)
+    def test_not_sampled(self):
+        response = self.client.get(self.page.get_absolute_url())
+        self.assertFalse(response.has_header('Server-Timing'))
 
-    def test_random_pages_uniqueness(self):
+    def test_cache_counts(self):
         """
-        Return a queryset with 3 unique objects.
+        Count the keys of `get_many()` once, though it calls `get()`.
         """
-        create_test_page(4)
-        create_test_active_page(4)
-
-        random_page = Page.objects.get_random_pages()
+        cache.set('instrumented', 1)
+        metrics = RequestMetrics()
+        with metrics.record_cache():
+            cache.get('instrumented')
+            cache.get('not-instrumented')
+            cache.get_many(['instrumented', 'not-instrumented'])
 
-        self.assertNotEqual(random_page[0].id, random_page[1].id)
-        self.assertNotEqual(random_page[1].id, random_page[2].id)
-        self.assertNotEqual(random_page[0].id, random_page[2].id)
-        self.assertIs(len(random_page), 3)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 2))
+        self.assertNotIn('get', vars(cache))
 
-    def test_a_new_pid(self):
+    def test_stats(self):
         """
-        Generate a new pid with 13 characters length.
+        Show the sampled views to staff only.
         """
-        new_pid = generate_pid()
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=1):
+            self.client.get(self.page.get_absolute_url())
+            self.client.get(self.page.get_absolute_url())
 
-        self.assertEqual(len(new_pid), 16)
+        url = reverse('instrumentation-stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        user = User.objects.create_superuser('admin@example.com', 'secret')
+        self.client.force_login(user)
+        views = {view['view']: view
+                 for view in self.client.get(url).json()['views']}
+
+        self.assertEqual(views['web:page-detail']['samples'], 2)
+        self.assertGreater(views['web:page-detail']['queries'], 0)
 
 
 class ToPersianFilterTests(TestCase):
@@ -317,6 +1204,483 @@ class ToPersianFilterTests(TestCase):
         self.assertEqual(result, converted_text)
 
 
+class PersianEditorsTests(TestCase):
+
+    def test_with_all_editors(self):
+        """
+        Apply every editor in the given order.
+        """
+        editor = PersianEditors(['space', 'number', 'arabic',
+                                 'punctuation_marks'])
+        original_text = 'سلام  دنیا ، این يك متن "آزمایشی" است ?  عدد 12 .'
+        edited_text = 'سلام دنیا، این یک متن «آزمایشی» است ؟ عدد ۱۲.'
+
+        self.assertEqual(editor.run(original_text), edited_text)
+
+    def test_with_space_around_quote_marks(self):
+        """
+        Remove spaces inside quote marks and add one after marks.
+        """
+        editor = PersianEditors(['space', 'arabic'])
+        original_text = 'كتاب  «  خوب »است.بله'
+        edited_text = 'کتاب «خوب» است. بله'
+
+        self.assertEqual(editor.run(original_text), edited_text)
+
+    def test_with_space_after_punctuation_marks(self):
+        """
+        Fix spaces around marks produced by a previous editor.
+        """
+        editor = PersianEditors(['punctuation_marks', 'space'])
+
+        self.assertEqual(editor.run('a ,b ?c'), 'a، b؟ c')
+
+    def test_with_escape_return(self):
+        """
+        Keep new lines only if `escape_return` is off.
+        """
+        editor = PersianEditors(['space'])
+
+        self.assertEqual(editor.run(' a\r\nb '), 'a b')
+
+        editor.escape_return = False
+
+        self.assertEqual(editor.run(' a\r\nb '), 'a\r\nb')
+
+    def test_get_editors_reuse_instance(self):
+        """
+        Return the same compiled editors for the same editors and options.
+        """
+        editor = get_editors(['space', 'number'])
+
+        self.assertIs(editor, get_editors(('space', 'number')))
+        self.assertIsNot(editor, get_editors(['space', 'number'],
+                                             escape_return=False))
+        self.assertEqual(editor.run(' a  1 '), 'a ۱')
+
+    def test_get_editors_is_immutable(self):
+        """
+        Raise error on changing the options of compiled editors.
+        """
+        editor = get_editors(['space'])
+
+        with self.assertRaises(AttributeError):
+            editor.strip = False
+
+    def test_normalize_many(self):
+        """
+        Edit every text and keep the order.
+        """
+        edited_texts = normalize_many([' يك ', 'a  1?', ''])
+
+        self.assertEqual(edited_texts, ['یک', 'a ۱؟', ''])
+
+    def test_get_editors_with_wrong_editor(self):
+        """
+        Raise error on unknown editor.
+        """
+        with self.assertRaises(TypeError):
+            get_editors(['unknown'])
+
+
+class NormalizePagesCommandTests(TestCase):
+
+    def setUp(self):
+        Page.objects.create(title='Linux 2', content='يك', is_active=True)
+        Page.objects.create(title='Python', content='')
+
+    def test_dry_run(self):
+        """
+        Count the changed pages without saving them.
+        """
+        out = StringIO()
+        call_command('normalize_pages', dry_run=True, stdout=out)
+
+        self.assertIn('1 page(s) would be normalized.', out.getvalue())
+        self.assertTrue(Page.objects.filter(title='Linux 2').exists())
+
+    def test_normalize(self):
+        """
+        Save the normalized fields and refresh the search vector.
+        """
+        out = StringIO()
+        call_command('normalize_pages', batch_size=1, stdout=out)
+
+        self.assertIn('1 page(s) normalized.', out.getvalue())
+        page = Page.objects.get(title='Linux ۲')
+        self.assertEqual(page.content, 'یک')
+        self.assertQuerysetEqual(Page.objects.search('یک'),
+                                 ['<Page: Linux ۲>'])
+
+    def test_normalize_expire_page_detail(self):
+        """
+        Show the normalized text and change the ETag of normalized pages.
+        """
+        cache.clear()
+        page = Page.objects.get(title='Linux 2')
+        url = reverse('web:page-detail', args=(page.pid,))
+        response = self.client.get(url)
+        self.assertContains(response, 'يك')
+
+        call_command('normalize_pages', stdout=StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'یک')
+        self.assertNotContains(response, 'يك')
+
+
+class AuditIndexesCommandTests(TestCase):
+
+    def test_audit(self):
+        """
+        List the indexes of the web tables, never reporting constraints as
+        unused.
+        """
+        out = StringIO()
+        call_command('audit_indexes', all=True, stdout=out)
+
+        self.assertIn('web_page.web_page_active_lang_idx', out.getvalue())
+        self.assertNotRegex(out.getvalue(), r'web_page_pkey.*unused')
+        self.assertIn('unused index(es) using', out.getvalue())
+
+
+class GenerateThumbnailsCommandTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def create_image_page(self, size=(800, 600), **kwargs):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, format='PNG')
+        return Page.objects.create(
+            title='Mezzo', content='', is_active=True,
+            image=SimpleUploadedFile('mezzo.png', buffer.getvalue()),
+            **kwargs)
+
+    def test_generate(self):
+        """
+        Write a JPEG and a WebP thumbnail for every geometry.
+        """
+        page = self.create_image_page()
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        page.refresh_from_db()
+
+        self.assertIn('1 image(s) thumbnailed', out.getvalue())
+        self.assertEqual(page.thumbnails['source'], page.image.name)
+        self.assertEqual(set(page.thumbnails['sizes']),
+                         set(get_thumbnail_geometries()))
+
+        thumbnail = page.thumbnails['sizes']['536x290']
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (536, 290))
+        for name, format in [(thumbnail['name'], 'JPEG'),
+                             (thumbnail['webp_name'], 'WEBP')]:
+            with Image.open(os.path.join(settings.MEDIA_ROOT, name)) as image:
+                self.assertEqual(image.format, format)
+                self.assertEqual(image.size, (536, 290))
+
+    def test_small_image_is_not_upscaled(self):
+        page = self.create_image_page(size=(200, 100))
+        call_command('generate_thumbnails', stdout=StringIO())
+        page.refresh_from_db()
+
+        thumbnail = page.thumbnails['sizes']['290x290']
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (200, 100))
+
+    def test_new_image_expires_thumbnails(self):
+        page = self.create_image_page()
+        call_command('generate_thumbnails', stdout=StringIO())
+        page.refresh_from_db()
+
+        page.title = 'Laum'
+        page.save()
+        self.assertNotEqual(page.thumbnails, {})
+
+        with page.image.open('rb'):
+            content = page.image.read()
+        page.image = SimpleUploadedFile('laum.png', content)
+        page.save()
+        self.assertEqual(page.thumbnails, {})
+
+    def test_broken_image(self):
+        """
+        Remember the failure, so the page isn't retried on every run.
+        """
+        page = Page.objects.create(
+            title='Mezzo', content='',
+            image=SimpleUploadedFile('mezzo.png', b'not an image'))
+        out = StringIO()
+        with self.assertLogs('web.management.commands.generate_thumbnails',
+                             'ERROR'):
+            call_command('generate_thumbnails', stdout=out)
+        call_command('generate_thumbnails', stdout=out)
+        page.refresh_from_db()
+
+        self.assertEqual(out.getvalue().count('1 image(s) failed'), 1)
+        self.assertIn('error', page.thumbnails)
+
+    def test_render(self):
+        """
+        Templates render the pre-generated thumbnails without generating,
+        at the URLs of the current storage.
+        """
+        page = self.create_image_page()
+        call_command('generate_thumbnails', stdout=StringIO())
+        page.refresh_from_db()
+        sizes = page.thumbnails['sizes']
+
+        with override_settings(MEDIA_URL='/cdn/'):
+            response = self.client.get(page.get_absolute_url())
+
+        self.assertContains(response, f'/cdn/{sizes["410x410"]["webp_name"]}')
+        self.assertContains(response, f'/cdn/{sizes["536x290"]["name"]}')
+
+    def test_render_without_thumbnails(self):
+        """
+        Until the worker has run, pages fall back to their original image,
+        sized by the dimensions stored with it.
+        """
+        self.create_image_page()
+        page = Page.objects.get()
+        self.assertEqual(page.thumbnails, {})
+        self.assertEqual((page.image_width, page.image_height), (800, 600))
+
+        thumbnail = page_thumbnail(page, '410x410')
+        self.assertEqual(thumbnail['url'], page.image.url)
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (410, 410))
+        self.assertIsNone(thumbnail['webp_url'])
+        thumbnail = page_thumbnail(page, '536x290')
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (536, 290))
+
+        response = self.client.get(page.get_absolute_url())
+        self.assertContains(response, thumbnail['url'])
+        self.assertNotContains(response, 'type="image/webp"')
+
+
+class ImportExportPagesCommandTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'pages.jsonl')
+
+        group = Group.objects.create()
+        python = Page.objects.create(title='Python', content='يك',
+                                     is_active=True, group=group)
+        Page.objects.create(title='Linux', content='', group=group,
+                            language='fa')
+        python.tags.add(Tag.objects.create(name='snake', keyword='snake'))
+
+    def export(self):
+        call_command('export_pages', output=self.path, stderr=StringIO())
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_export(self):
+        records = self.export()
+
+        self.assertEqual([record['type'] for record in records],
+                         ['tag', 'group', 'page', 'page'])
+        python = Page.objects.get(title='Python')
+        self.assertEqual(records[2]['pid'], python.pid)
+        self.assertEqual(records[2]['group'], python.group_id)
+        self.assertEqual(records[2]['tags'], ['snake'])
+        self.assertEqual(records[3]['tags'], [])
+
+    def test_import(self):
+        """
+        Recreate the exported pages with their group and tags, normalized.
+        """
+        self.export()
+        python = Page.objects.get(title='Python')
+        Page.objects.all().delete()
+        Tag.objects.all().delete()
+        Group.objects.all().delete()
+
+        out = StringIO()
+        call_command('import_pages', self.path, stdout=out)
+
+        self.assertIn('2 page(s), 1 group(s) and 1 tag(s) imported',
+                      out.getvalue())
+        page = Page.objects.get(pid=python.pid)
+        self.assertEqual(page.content, 'یک')
+        self.assertEqual(page.group_id, python.group_id)
+        self.assertEqual([tag.name for tag in page.tags.all()], ['snake'])
+        self.assertEqual(page.group.titles, {'en': 'Python', 'fa': 'Linux'})
+        self.assertQuerysetEqual(Page.objects.search('snake'),
+                                 ['<Page: Python>'])
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_import_existing(self):
+        """
+        Skip the existing pages and allocate pids for pages with no pid.
+        """
+        self.export()
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'type': 'page', 'title': 'Django',
+                                   'content': '', 'tags': ['web']}) + '\n')
+
+        out = StringIO()
+        call_command('import_pages', self.path, stdout=out)
+
+        self.assertIn('1 page(s), 0 group(s) and 1 tag(s) imported, '
+                      '2 existing page(s) skipped', out.getvalue())
+        page = Page.objects.get(title='Django')
+        self.assertTrue(page.pid.startswith(f'{settings.PID_PREFIX}_'))
+        self.assertEqual(page.tags.get().keyword, 'web')
+
+    def test_resume(self):
+        """
+        Continue after the lines counted in the checkpoint.
+        """
+        self.export()
+        Page.objects.filter(title='Linux').delete()
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'done': 3, 'pids': {}}, file)
+
+        out = StringIO()
+        call_command('import_pages', self.path, batch_size=1, stdout=out)
+
+        self.assertIn('Resuming after line 3.', out.getvalue())
+        self.assertIn('1 page(s), 0 group(s) and 0 tag(s) imported',
+                      out.getvalue())
+        self.assertTrue(Page.objects.filter(title='Linux').exists())
+
+    def test_resume_without_pid(self):
+        """
+        Reuse the pids allocated for a batch committed right before a crash,
+        so its pages with no pid are not imported twice.
+        """
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for title in ['Django', 'Flask']:
+                file.write(json.dumps({'type': 'page', 'title': title,
+                                       'content': ''}) + '\n')
+        # The state left by a crash after the first batch was committed.
+        pid = pid_allocator()
+        Page.objects.create(title='Django', content='', pid=pid)
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'done': 0, 'pids': {'1': pid}}, file)
+
+        out = StringIO()
+        call_command('import_pages', self.path, batch_size=1, stdout=out)
+
+        self.assertIn('1 page(s), 0 group(s) and 0 tag(s) imported, '
+                      '1 existing page(s) skipped', out.getvalue())
+        self.assertEqual(Page.objects.filter(title='Django').get().pid, pid)
+        self.assertTrue(Page.objects.filter(title='Flask').exists())
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_benchmark(self):
+        """
+        Report every benchmark as JSON and keep nothing seeded.
+        """
+        out = StringIO()
+        call_command('benchmark', pages=20, tags=5, iterations=2, warmup=1,
+                     stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['options']['pages'], 20)
+        self.assertEqual(set(report['results']), {
+            'search', 'random_pages', 'page_detail', 'page_list', 'sitemap',
+            'admin_changelists', 'persian_editors'})
+        for result in report['results'].values():
+            self.assertLessEqual(result['p50_ms'], result['max_ms'])
+        self.assertEqual(report['results']['persian_editors']['queries'], 0)
+        self.assertEqual(Page.objects.count(), 0)
+        self.assertEqual(User.objects.count(), 0)
+
+
+class SendEmailsCommandTests(TestCase):
+
+    def create_email(self, subject, to='go.mezzo@icloud.com', **kwargs):
+        return Email.objects.create(subject=subject, body=subject,
+                                    from_email='laum@example.com', to=[to],
+                                    **kwargs)
+
+    def test_queue(self):
+        """
+        Store the rendered email instead of sending it.
+        """
+        Email.objects.queue(None, {'page': Page(title='Linux')},
+                            'emails/new_page.html', ['go.mezzo@icloud.com'])
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = Email.objects.get()
+        self.assertEqual(email.status, Email.STATUS_IS_PENDING)
+        self.assertEqual(email.to, ['go.mezzo@icloud.com'])
+
+    def test_queue_without_recipients(self):
+        """
+        Skip emails with no recipient.
+        """
+        Email.objects.queue(None, {}, 'emails/new_page.html', ['', None])
+        self.assertFalse(Email.objects.exists())
+
+    def test_send(self):
+        """
+        Send the due emails and mark them as sent.
+        """
+        self.create_email('First')
+        self.create_email('Later', next_attempt_on=timezone.now() +
+                          timedelta(hours=1))
+        call_command('send_emails', stdout=StringIO())
+
+        self.assertEqual([m.subject for m in mail.outbox], ['First'])
+        self.assertEqual(Email.objects.get(subject='First').status,
+                         Email.STATUS_IS_SENT)
+        self.assertEqual(Email.objects.get(subject='Later').status,
+                         Email.STATUS_IS_PENDING)
+
+    def test_notifications_digest(self):
+        """
+        Merge the notifications for the same recipients into one email.
+        """
+        for subject in ['First', 'Second']:
+            self.create_email(subject, to='admin@example.com',
+                              kind=Email.KIND_IS_NOTIFICATION)
+        self.create_email('Third', kind=Email.KIND_IS_NOTIFICATION)
+        call_command('send_emails', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Email.objects.exclude(
+            status=Email.STATUS_IS_SENT).exists())
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='localhost', EMAIL_PORT=1)
+    def test_retry(self):
+        """
+        Postpone the failed emails and give up after the last attempt.
+        """
+        email = self.create_email('First')
+        call_command('send_emails', retry_delay=60, max_attempts=2,
+                     stdout=StringIO())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, Email.STATUS_IS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_on, timezone.now())
+        self.assertTrue(email.last_error)
+
+        Email.objects.update(next_attempt_on=timezone.now())
+        call_command('send_emails', max_attempts=2, stdout=StringIO())
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, Email.STATUS_IS_FAILED)
+        self.assertEqual(email.attempts, 2)
+
+
 class PageCreateApiTest(TestCase):
 
     def test_with_no_required_field(self):
@@ -414,6 +1778,154 @@ class PageCreateApiTest(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(Page.objects.count(), 0)
 
+    def post_image(self, size, format='PNG'):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, format=format)
+        url = reverse('web:page-create')
+        data = {'title': 'test',
+                'content': 'cursus euismod quis viverra nibh cras pulvinar '
+                           'mattis nunc sed blandit libero volutpat sed '
+                           'cras ornare arcu dui vivamus arcu felis '
+                           'bibendum ut',
+                'image': SimpleUploadedFile(f'test.{format.lower()}',
+                                            buffer.getvalue())}
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                url, data, enforce_csrf_checks=True,
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            page = Page.objects.first()
+            image_size = page and page.image and \
+                (page.image.width, page.image.height)
+        return response, image_size
+
+    @override_settings(PAGE_IMAGE_MAX_DIMENSION=100)
+    def test_with_oversized_image(self):
+        """
+        Downscale an image larger than the maximum dimension on upload.
+        """
+        response, image_size = self.post_image((400, 200), 'JPEG')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(image_size, (100, 50))
+
+        Page.objects.all().delete()
+        response, image_size = self.post_image((80, 40))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(image_size, (80, 40))
+
+    @override_settings(PAGE_IMAGE_MAX_PIXELS=1000)
+    def test_with_too_many_pixels(self):
+        """
+        Reject an image by the dimensions in its header.
+        """
+        response, image_size = self.post_image((100, 100))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.assertEqual(Page.objects.count(), 0)
+
+
+class GroupModelTests(TestCase):
+
+    def setUp(self):
+        self.group = Group.objects.create()
+        self.page = Page.objects.create(title='Linux', content='',
+                                        group=self.group)
+
+    def test_str_without_query(self):
+        """
+        Show the stored title in the active language with no query.
+        """
+        group = Group.objects.get()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(str(group), 'Linux')
+
+    def test_title_in_other_language(self):
+        """
+        Fall back to the gid if no page has the active language.
+        """
+        Page.objects.create(title='لینوکس', content='', group=self.group,
+                            language='fa')
+        self.group.refresh_from_db()
+
+        self.assertEqual(self.group.titles, {'en': 'Linux', 'fa': 'لینوکس'})
+        with translation.override('de'):
+            self.assertEqual(str(self.group), self.group.gid)
+
+    def test_sync_titles(self):
+        """
+        Follow the title changes, moves and deletes of the pages.
+        """
+        self.page.title = 'Ubuntu'
+        self.page.save()
+        self.group.refresh_from_db()
+        self.assertEqual(str(self.group), 'Ubuntu')
+
+        new_group = Group.objects.create()
+        self.page.group = new_group
+        self.page.save()
+        self.group.refresh_from_db()
+        new_group.refresh_from_db()
+        self.assertEqual(self.group.titles, {})
+        self.assertEqual(str(new_group), 'Ubuntu')
+
+        self.page.delete()
+        new_group.refresh_from_db()
+        self.assertEqual(new_group.titles, {})
+
+    def test_keep_titles_on_other_change(self):
+        """
+        Skip the titles refresh if the title, language and group are kept.
+        """
+        self.page.content = 'Kernel'
+        with CaptureQueriesContext(connection) as queries:
+            self.page.save()
+
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'web_group' in query['sql']])
+
+    def test_admin_search(self):
+        """
+        Search the groups by their stored titles.
+        """
+        user = User.objects.create_superuser('admin@example.com', 'secret')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin:web_group_changelist'),
+                                   data={'q': 'linu'})
+
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class ReportModelTests(TestCase):
+
+    def setUp(self):
+        self.page = Page.objects.create(title='Linux', content='')
+
+    def test_rid(self):
+        """
+        Assign the rid with a single column update after the insert.
+        """
+        with self.assertNumQueries(2):
+            report = Report.objects.create(page=self.page, body='Gnome',
+                                           reporter='go.mezzo@icloud.com')
+
+        rid = f'lmr_{self.page.pid.split("_")[1]}_{report.pk}'
+        self.assertEqual(report.rid, rid)
+        self.assertEqual(Report.objects.get().rid, rid)
+
+    def test_bulk_create_rid(self):
+        """
+        Assign the rids of bulk created reports.
+        """
+        reports = Report.objects.bulk_create([
+            Report(page=self.page, body=body, reporter='go.mezzo@icloud.com')
+            for body in ['Gnome', 'KDE']])
+
+        self.assertEqual(
+            sorted(Report.objects.values_list('rid', flat=True)),
+            sorted(f'lmr_{self.page.pid.split("_")[1]}_{report.pk}'
+                   for report in reports))
+
 
 class ReportApiTest(TestCase):
 
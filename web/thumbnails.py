@@ -0,0 +1,146 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+THUMBNAIL_NAME = 'thumbnails/{geometry}/{stem}-{digest}.{extension}'
+THUMBNAIL_GEOMETRIES = ['268x268', '290x290', '410x410', '536x290']
+
+
+def get_thumbnail_geometries():
+    return getattr(settings, 'THUMBNAIL_GEOMETRIES', THUMBNAIL_GEOMETRIES)
+
+
+def parse_geometry(geometry):
+    width, height = geometry.split('x')
+    return int(width), int(height)
+
+
+def make_thumbnail_name(name, geometry, extension):
+    """
+    Return the storage name of the thumbnail of the image `name`, which
+    stays the same for the same image, so regenerating overwrites it.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    digest = hashlib.md5(name.encode()).hexdigest()[:8]
+    return THUMBNAIL_NAME.format(geometry=geometry, stem=stem, digest=digest,
+                                 extension=extension)
+
+
+def scale_to_cover(image_size, size):
+    """
+    Return `image_size` scaled down to cover `size`, or as is if it is
+    already smaller.
+    """
+    (image_width, image_height), (width, height) = image_size, size
+    ratio = min(max(width / image_width, height / image_height), 1)
+    return (max(round(image_width * ratio), 1),
+            max(round(image_height * ratio), 1))
+
+
+def get_thumbnail_size(image_size, geometry):
+    """
+    Return the size of the thumbnail in `geometry` of an image of
+    `image_size`, without making it.
+    """
+    width, height = parse_geometry(geometry)
+    scaled_width, scaled_height = scale_to_cover(image_size, (width, height))
+    return min(width, scaled_width), min(height, scaled_height)
+
+
+def crop_center(image, size):
+    """
+    Scale `image` down to cover `size` and crop the center of it, as sorl's
+    `crop='center'` does. Smaller images are cropped but never upscaled.
+    """
+    width, height = size
+    scaled_size = scale_to_cover(image.size, size)
+    if scaled_size != image.size:
+        image = image.resize(scaled_size, Image.LANCZOS)
+
+    left = (image.width - min(width, image.width)) // 2
+    top = (image.height - min(height, image.height)) // 2
+    return image.crop((left, top, left + min(width, image.width),
+                       top + min(height, image.height)))
+
+
+def save_thumbnail(image, name, format, storage, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_thumbnails(image_file, geometries=None, storage=None):
+    """
+    Write a JPEG and a WebP thumbnail of `image_file` in each geometry to
+    `storage` and return their storage names and sizes, so no thumbnail
+    is looked up or generated while rendering.
+    """
+    geometries = geometries or get_thumbnail_geometries()
+    storage = storage or default_storage
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 85)
+    webp_quality = getattr(settings, 'THUMBNAIL_WEBP_QUALITY', 80)
+
+    with image_file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(image_file))
+        image = image.convert('RGB')
+
+    sizes = {}
+    for geometry in geometries:
+        thumbnail = crop_center(image, parse_geometry(geometry))
+        name = save_thumbnail(
+            thumbnail, make_thumbnail_name(image_file.name, geometry, 'jpg'),
+            'JPEG', storage, quality=quality, optimize=True)
+        webp_name = save_thumbnail(
+            thumbnail, make_thumbnail_name(image_file.name, geometry, 'webp'),
+            'WEBP', storage, quality=webp_quality)
+        sizes[geometry] = {'name': name, 'webp_name': webp_name,
+                           'width': thumbnail.width,
+                           'height': thumbnail.height}
+
+    return {'source': image_file.name, 'sizes': sizes}
+
+
+def downscale_image(image_file, max_dimension, quality=85):
+    """
+    Return `image_file` if it fits in `max_dimension`, otherwise a copy
+    scaled down to fit and re-encoded into a temporary file, spooled to
+    disk past `FILE_UPLOAD_MAX_MEMORY_SIZE`.
+
+    JPEG images are decoded at the smallest scale still larger than the
+    target, so a large upload is never decoded at full size.
+    """
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        if max(image.size) <= max_dimension:
+            image_file.seek(0)
+            return image_file
+
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            image, format, options = image.convert('RGBA'), 'PNG', {}
+        else:
+            image, format = image.convert('RGB'), 'JPEG'
+            options = {'quality': quality, 'optimize': True}
+
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        dir=settings.FILE_UPLOAD_TEMP_DIR)
+    image.save(output, format=format, **options)
+    size = output.tell()
+    output.seek(0)
+
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+    return UploadedFile(output, f'{stem}.{format.lower()}',
+                        Image.MIME[format], size)
@@ -1,16 +1,12 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib.sitemaps.views import sitemap
+from django.contrib.sitemaps import views as sitemaps_views
 from django.urls.conf import path
-from django.views.generic import TemplateView
 
 from . import views
-from .sitemaps import PageSitemap, StaticViewSitemap
+from .sitemaps import get_sitemaps
 
-sitemaps = {
-    'pages': PageSitemap,
-    'statics': StaticViewSitemap
-}
+sitemaps = get_sitemaps()
 
 app_name = 'web'
 urlpatterns = [
@@ -20,9 +16,12 @@ urlpatterns = [
     path('page/create/', views.PageCreateView.as_view(), name='page-create'),
     path('report/create/', views.ReportCreateView.as_view(),
          name='report-create'),
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='sitemap'),
-    path('robots.txt', TemplateView.as_view(template_name='web/robots.txt',
-                                            content_type='text/plain')),
+    path('sitemap.xml', sitemaps_views.index,
+         {'sitemaps': sitemaps, 'sitemap_url_name': 'web:sitemap-section'},
+         name='sitemap'),
+    path('sitemap-<section>.xml', sitemaps_views.sitemap,
+         {'sitemaps': sitemaps}, name='sitemap-section'),
+    path('robots.txt', views.RobotsView.as_view(), name='robots'),
 ]
 
 # This is only needed when using runserver.
@@ -1,11 +1,17 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.sites.shortcuts import get_current_site
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.views import defaults
 from django.views.generic import CreateView, DetailView, ListView, TemplateView
 
-from .mixins import AjaxableResponseMixin
+from .mixins import AjaxableResponseMixin, ConditionalGetMixin
 from .forms import SearchForm, PageForm, ReportForm
+from .instrumentation import get_stats
 from .models import Page, Report
+from .sitemaps import SITEMAP_INDEX_FILENAME, get_sitemaps_url
 
 ERROR_400_TEMPLATE_NAME = 'errors/error_400.html'
 ERROR_403_TEMPLATE_NAME = 'errors/error_403.html'
@@ -30,56 +36,112 @@ def server_error(request, template_name=ERROR_500_TEMPLATE_NAME):
     return defaults.server_error(request, template_name)
 
 
-class IndexView(TemplateView):
+@staff_member_required
+def instrumentation_stats(request):
+    """
+    Return the statistics of the requests sampled by this process.
+    """
+    return JsonResponse({
+        'sample_rate': getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0),
+        'views': get_stats(),
+    })
+
+
+class IndexView(ConditionalGetMixin, TemplateView):
     model = Page
     template_name = 'web/pages/index.html'
 
+    def get(self, request, *args, **kwargs):
+        response = self.get_conditional_response()
+        if response is not None:
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        return self.set_validators(response)
+
+    def get_last_modified(self):
+        # Random pages are sampled from a pool, so the page only changes
+        # when the pool does.
+        epoch, pages_pk = self.model.objects.get_random_pages_pool()
+        return epoch
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = SearchForm
-        context['page_form'] = PageForm
+        context['search_form'] = SearchForm()
+        context['page_form'] = PageForm()
         context['random_pages'] = self.model.objects.get_random_pages()
         return context
 
 
-class PageListView(ListView):
+class PageListView(ConditionalGetMixin, ListView):
     model = Page
     template_name = 'web/pages/page_list.html'
     paginate_by = 8
 
     def get(self, request, *args, **kwargs):
         q = request.GET.get('q')
-        if q:
-            return super().get(request, *args, **kwargs)
-        return redirect(reverse('web:index'))
+        if not q:
+            return redirect(reverse('web:index'))
+
+        self.object_list = self.get_queryset()
+
+        response = self.get_conditional_response()
+        if response is not None:
+            return response
+
+        context = self.get_context_data()
+        return self.set_validators(self.render_to_response(context))
 
     def get_queryset(self):
         q = self.request.GET.get('q')
-        return self.model.objects.search(q)
+        return self.model.objects.cached_search(q)
+
+    def get_last_modified(self):
+        return self.object_list.last_modified
+
+    def get_etag_vary_on(self):
+        # A page leaving the result doesn't move the newest `updated_on`.
+        return self.object_list.pids
 
     def get_context_data(self, *, object_list=None, **kwargs):
         q = self.request.GET.get('q')
         context = super().get_context_data(**kwargs)
         context['search_form'] = SearchForm(initial={'q': q})
-        context['page_form'] = PageForm
+        context['page_form'] = PageForm()
         return context
 
 
-class PageDetailView(DetailView):
+class PageDetailView(ConditionalGetMixin, DetailView):
     model = Page
     slug_field = 'pid'
     template_name = 'web/pages/page_detail.html'
 
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+
+        response = self.get_conditional_response()
+        if response is not None:
+            return response
+
+        context = self.get_context_data(object=self.object)
+        return self.set_validators(self.render_to_response(context))
+
     def get_object(self, queryset=None):
         pid = self.kwargs.get(self.slug_url_kwarg)
         return get_object_or_404(self.model.objects.all_active(), pid=pid)
 
+    def get_last_modified(self):
+        return self.object.updated_on
+
     def get_context_data(self, *, object_list=None, **kwargs):
         pid = self.kwargs.get(self.slug_url_kwarg)
         context = super().get_context_data(**kwargs)
         context['search_form'] = SearchForm(initial={'q': None})
         context['report_form'] = ReportForm(initial={'page': pid})
-        context['page_form'] = PageForm
+        context['page_form'] = PageForm()
+        context['alternate_paths'] = self.object.get_alternate_paths()
+        context['cache_timeout'] = getattr(
+            settings, 'PAGE_DETAIL_CACHE_TIMEOUT', 60 * 60 * 24)
         return context
 
 
@@ -91,3 +153,16 @@ class PageCreateView(AjaxableResponseMixin, CreateView):
 class ReportCreateView(AjaxableResponseMixin, CreateView):
     model = Report
     form_class = ReportForm
+
+
+class RobotsView(TemplateView):
+    template_name = 'web/robots.txt'
+    content_type = 'text/plain'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # The index written by `generate_sitemaps`, not the dynamic one.
+        domain = get_current_site(self.request).domain
+        context['sitemap_url'] = \
+            f'{get_sitemaps_url(domain)}{SITEMAP_INDEX_FILENAME}'
+        return context